@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from django.http import Http404
+
+from .auth import auth_cache
+from .models import AdvertiserAccount
+
+# Session key holding the advertiser the user switched to.
+SESSION_KEY = "advertiser_id"
+
+
+def _accounts_key(user_id):
+    return f"auth:accounts:{user_id}"
+
+
+def _forget_accounts(user_ids):
+    cache = auth_cache()
+    if cache is not None:
+        cache.delete_many([_accounts_key(user_id) for user_id in user_ids])
+
+
+def user_accounts(request):
+    """
+    Return `[(advertiser_id, name)]` the request's user may manage, loaded
+    once per request and, with a shared cache, cached until their accounts
+    change.
+
+    Users without any AdvertiserAccount fall back to TIKTOK_ADVERTISER_ID,
+    so single-account deployments keep working unchanged.
+    """
+    if not hasattr(request, "_advertiser_accounts"):
+        accounts = []
+        if request.user.is_authenticated:
+            cache = auth_cache()
+            accounts = cache.get(_accounts_key(request.user.pk)) if cache is not None else None
+            if accounts is None:
+                accounts = list(AdvertiserAccount.objects.filter(users=request.user)
+                                .values_list("advertiser_id", "name"))
+                if cache is not None:
+                    cache.set(_accounts_key(request.user.pk), accounts, settings.AUTH_CACHE_TTL)
+        if not accounts and settings.TIKTOK_ADVERTISER_ID:
+            accounts = [(settings.TIKTOK_ADVERTISER_ID, settings.TIKTOK_ADVERTISER_ID)]
+        request._advertiser_accounts = accounts
+    return request._advertiser_accounts
+
+
+def current_advertiser(request):
+    """
+    Return the advertiser id the request works on: the one picked in the
+    account switcher if the user may still use it, otherwise their first.
+    """
+    accounts = dict(user_accounts(request))
+    selected = request.session.get(SESSION_KEY)
+    if selected in accounts:
+        return selected
+    return next(iter(accounts), None)
+
+
+def require_advertiser(request):
+    """
+    current_advertiser(), for views that write: raises Http404 when the user
+    has no advertiser account and TIKTOK_ADVERTISER_ID is unset.
+    """
+    advertiser_id = current_advertiser(request)
+    if not advertiser_id:
+        raise Http404("No advertiser account is set up.")
+    return advertiser_id
+
+
+def can_access(request, advertiser_id):
+    return advertiser_id in dict(user_accounts(request))
+
+
+def advertiser_accounts(request):
+    """
+    Template context processor for the account switcher.
+    """
+    if not request.user.is_authenticated:
+        return {}
+    return {
+        "advertiser_accounts": user_accounts(request),
+        "current_advertiser": current_advertiser(request),
+    }
+
+
+@receiver(post_save, sender=AdvertiserAccount)
+@receiver(pre_delete, sender=AdvertiserAccount)
+def _account_changed(sender, instance, **kwargs):
+    _forget_accounts(instance.users.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=AdvertiserAccount.users.through)
+def _account_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.advertiser_accounts.add()/remove()/clear()
+        if action.startswith("post_"):
+            _forget_accounts([instance.pk])
+    elif action == "pre_clear":
+        _forget_accounts(instance.users.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        _forget_accounts(pk_set)
@@ -1,3 +1,47 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AdGroup, AdvertiserAccount, BulkJob, BulkJobItem, Campaign, Rule, SyncState
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ('campaign_id', 'campaign_name', 'budget', 'operation_status', 'modify_time')
+    search_fields = ('campaign_id', 'campaign_name')
+
+
+@admin.register(AdGroup)
+class AdGroupAdmin(admin.ModelAdmin):
+    list_display = ('adgroup_id', 'adgroup_name', 'campaign_id', 'budget', 'schedule_end_time', 'modify_time')
+    search_fields = ('adgroup_id', 'adgroup_name')
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ('advertiser_id', 'object_type', 'watermark', 'synced_at')
+
+
+class BulkJobItemInline(admin.TabularInline):
+    model = BulkJobItem
+    extra = 0
+    readonly_fields = ('object_id', 'status', 'error')
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'object_type', 'action', 'value', 'status', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'action', 'object_type')
+    inlines = [BulkJobItemInline]
+
+
+@admin.register(AdvertiserAccount)
+class AdvertiserAccountAdmin(admin.ModelAdmin):
+    list_display = ('advertiser_id', 'name')
+    search_fields = ('advertiser_id', 'name')
+    filter_horizontal = ('users',)
+
+
+@admin.register(Rule)
+class RuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'advertiser_id', 'enabled', 'action', 'value', 'priority', 'last_run_at', 'last_result')
+    list_filter = ('enabled', 'action')
+    readonly_fields = ('last_run_at', 'last_result')
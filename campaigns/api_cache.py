@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+
+def _cache():
+    return caches[settings.TIKTOK_CACHE_ALIAS]
+
+
+def _record_key(kind, advertiser_id, item_id):
+    return f"tiktok:{advertiser_id}:{kind}:record:{item_id}"
+
+
+def _generation_key(kind, advertiser_id):
+    return f"tiktok:{advertiser_id}:{kind}:generation"
+
+
+def _page_key(kind, advertiser_id, page, page_size, filtering):
+    generation = _cache().get_or_set(_generation_key(kind, advertiser_id), 0, None)
+    filters = hashlib.md5(json.dumps(filtering or {}, sort_keys=True).encode()).hexdigest()
+    return f"tiktok:{advertiser_id}:{kind}:page:{generation}:{page}:{page_size}:{filters}"
+
+
+def get_page(kind, advertiser_id, page, page_size, filtering=None):
+    """
+    Return a cached `(records, page_info)` list page, or None on a miss.
+
+    Pages only hold ids; the records themselves live in per-id entries, so a
+    page is a miss as soon as any of its records has expired or been evicted.
+    """
+    cache = _cache()
+    entry = cache.get(_page_key(kind, advertiser_id, page, page_size, filtering))
+    records = _get_records(kind, advertiser_id, entry[0]) if entry is not None else {}
+    if entry is None or len(records) != len(entry[0]):
+        metrics.record_cache("cache", 0, 1)
+        return None
+    item_ids, page_info = entry
+    metrics.record_cache("cache", 1, 0)
+    return [records[item_id] for item_id in item_ids], page_info
+
+
+def set_page(kind, advertiser_id, page, page_size, records, page_info, filtering=None):
+    id_field = f"{kind}_id"
+    set_records(kind, advertiser_id, records)
+    item_ids = [str(record.get(id_field)) for record in records]
+    _cache().set(_page_key(kind, advertiser_id, page, page_size, filtering),
+                 (item_ids, page_info), settings.TIKTOK_CACHE_TTL)
+
+
+def get_records(kind, advertiser_id, item_ids):
+    """
+    Return `{id: record}` for the ids that are cached.
+    """
+    found = _get_records(kind, advertiser_id, item_ids)
+    metrics.record_cache("cache", len(found), len(item_ids) - len(found))
+    return found
+
+
+def _get_records(kind, advertiser_id, item_ids):
+    keys = {_record_key(kind, advertiser_id, item_id): str(item_id) for item_id in item_ids}
+    return {keys[key]: record for key, record in _cache().get_many(list(keys)).items()}
+
+
+def set_records(kind, advertiser_id, records):
+    id_field = f"{kind}_id"
+    _cache().set_many({
+        _record_key(kind, advertiser_id, record.get(id_field)): record for record in records
+    }, settings.TIKTOK_CACHE_TTL)
+
+
+def patch(kind, advertiser_id, item_ids, **values):
+    """
+    Apply a successful write to the cached copies of exactly these records.
+    """
+    cached = _get_records(kind, advertiser_id, item_ids)
+    for record in cached.values():
+        record.update(values)
+    set_records(kind, advertiser_id, cached.values())
+
+
+def invalidate(kind, advertiser_id, item_ids):
+    """
+    Drop deleted records and every cached list page of this kind, since the
+    remaining rows shift between pages.
+    """
+    cache = _cache()
+    cache.delete_many([_record_key(kind, advertiser_id, item_id) for item_id in item_ids])
+    try:
+        cache.incr(_generation_key(kind, advertiser_id))
+    except ValueError:
+        cache.set(_generation_key(kind, advertiser_id), 1, None)
@@ -1,6 +1,40 @@
 # campaigns/apps.py
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def check_shared_cache(setting, alias):
+    """
+    Raise ImproperlyConfigured unless `alias` names a cache every worker
+    shares; state kept in a per-process cache isn't seen by the others.
+    """
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    if not alias:
+        raise ImproperlyConfigured(f"{setting} must name a cache shared by every worker (e.g. REDIS_URL's 'shared').")
+    if alias not in settings.CACHES:
+        raise ImproperlyConfigured(f"{setting} names an unknown cache {alias!r}.")
+    if isinstance(caches[alias], LocMemCache):
+        raise ImproperlyConfigured(f"{setting} names {alias!r}, a per-process cache other workers can't see.")
+
 
 class CampaignsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'campaigns'
\ No newline at end of file
+    name = 'campaigns'
+
+    def ready(self):
+        # Connect the receivers that keep the cached users, tokens, accounts
+        # and mirror state in step with the database.
+        from . import accounts, auth, mirror  # noqa: F401
+
+        # Fail at startup rather than on first use when logouts, revoked
+        # tokens or the rate limit budget would only reach one worker.
+        if settings.SESSION_ENGINE in ("django.contrib.sessions.backends.cache",
+                                       "django.contrib.sessions.backends.cached_db"):
+            check_shared_cache("SESSION_CACHE_ALIAS", settings.SESSION_CACHE_ALIAS)
+        if settings.AUTH_CACHE_ALIAS:
+            check_shared_cache("AUTH_CACHE_ALIAS", settings.AUTH_CACHE_ALIAS)
+        if settings.TIKTOK_RATELIMIT_ENABLED:
+            check_shared_cache("TIKTOK_RATELIMIT_CACHE", settings.TIKTOK_RATELIMIT_CACHE)
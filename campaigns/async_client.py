@@ -0,0 +1,122 @@
+import asyncio
+import json
+import random
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+
+from . import metrics
+from .ratelimit import endpoint_class, get_limiter
+from .tiktok_client import (
+    RETRYABLE_API_CODES, RETRYABLE_STATUS_CODES, TikTokAPIError, api_code,
+    is_rate_limited, request_advertiser, response_size,
+)
+
+
+class AsyncTikTokClient:
+    """
+    httpx.AsyncClient counterpart of TikTokClient for async views.
+
+    Same timeouts, gzip negotiation and jittered retries; connections are
+    pooled and kept alive for the life of the event loop.
+    """
+
+    def __init__(self, base_url, access_token, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_base=0.5, backoff_cap=8.0, pool_maxsize=20):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/",
+            headers={
+                "Access-Token": access_token or "",
+                "Content-Type": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+            },
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    async def get(self, path, params=None):
+        encoded = {
+            key: json.dumps(value) if isinstance(value, (list, dict)) else value
+            for key, value in (params or {}).items()
+        }
+        return await self._request("GET", path, params=encoded)
+
+    async def post(self, path, payload):
+        return await self._request("POST", path, json=payload)
+
+    async def list_page(self, kind, advertiser_id, page=1, page_size=100, filtering=None):
+        """
+        Fetch one page of campaigns or ad groups (`kind`).
+
+        Returns `(items, page_info)`; raises TikTokAPIError on a non-zero code.
+        """
+        params = {"advertiser_id": advertiser_id, "page": page, "page_size": page_size}
+        if filtering:
+            params["filtering"] = filtering
+        response = await self.get(f"{kind}/get/", params)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("code") != 0:
+            raise TikTokAPIError(data.get("code"), data.get("message"))
+        body = data.get("data", {})
+        return body.get("list", []), body.get("page_info", {})
+
+    async def _request(self, method, path, **kwargs):
+        path = path.lstrip("/")
+        limiter = get_limiter()
+        advertiser_id = request_advertiser(kwargs)
+        attempt = 0
+        while True:
+            if limiter:
+                await limiter.aacquire(advertiser_id, endpoint_class(method))
+            start = time.perf_counter()
+            try:
+                response = await self.http.request(method, path, **kwargs)
+            except httpx.TransportError:
+                metrics.record_upstream(method, path, "error", time.perf_counter() - start, 0)
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                metrics.record_upstream(method, path, response.status_code, time.perf_counter() - start,
+                                        response_size(response))
+                if limiter and is_rate_limited(response):
+                    limiter.penalize(advertiser_id, endpoint_class(method))
+                if attempt >= self.max_retries or not self._should_retry(response):
+                    return response
+            metrics.record_retry(method, path)
+            await asyncio.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+            attempt += 1
+
+    def _should_retry(self, response):
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            return True
+        if response.status_code != 200:
+            return False
+        return api_code(response) in RETRYABLE_API_CODES
+
+
+# httpx.AsyncClient is bound to the loop it first runs on, so keep one per loop.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Return the AsyncTikTokClient shared by everything on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncTikTokClient(
+            base_url=settings.TIKTOK_BASE_URL,
+            access_token=settings.TIKTOK_ACCESS_TOKEN,
+            connect_timeout=settings.TIKTOK_CONNECT_TIMEOUT,
+            read_timeout=settings.TIKTOK_READ_TIMEOUT,
+            max_retries=settings.TIKTOK_MAX_RETRIES,
+            pool_maxsize=settings.TIKTOK_POOL_MAXSIZE,
+        )
+    return client
@@ -0,0 +1,405 @@
+import asyncio
+from datetime import datetime
+from urllib.parse import quote
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect
+
+from . import api_cache, mirror
+from .accounts import current_advertiser, require_advertiser, user_accounts
+from .async_client import get_async_client
+from .bulk import chunked, response_error
+from .conditional import conditional_render
+from .jobs import submit_job
+from .pagination import RemotePaginator, parse_page_args
+from .record_index import index
+from .tiktok_client import TikTokAPIError
+from .models import BulkJob
+from .ui_views import LOOKUP_BATCH_SIZE, normalize_adgroup, normalize_campaign, render_plan
+from .writes import record_write
+
+NORMALIZERS = {"campaign": normalize_campaign, "adgroup": normalize_adgroup}
+
+
+async def authenticated_user(request):
+    """
+    Resolve the session user, falling back to an API token, without blocking
+    the event loop. Returns None for anonymous requests.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        # DRF is only needed for token requests; keep it out of cold starts.
+        from rest_framework.exceptions import AuthenticationFailed
+        from .async_auth import AsyncTokenAuthentication
+
+        try:
+            auth = await AsyncTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            auth = None
+        if auth:
+            user = auth[0]
+    # Templates read request.user; hand them the resolved object, not the lazy one.
+    request.user = user
+    if not user.is_authenticated:
+        return None
+    # Load the session and the user's accounts now, so current_advertiser()
+    # and the account switcher don't touch the database on the event loop.
+    await sync_to_async(current_advertiser)(request)
+    return user
+
+
+async def afetch_page(kind, advertiser_id, page=1, page_size=100):
+    """
+    Async counterpart of ui_views.fetch_page().
+    """
+    normalize = NORMALIZERS[kind]
+    if await sync_to_async(mirror.is_synced)(kind, advertiser_id):
+        records, page_info = await sync_to_async(mirror.list_page)(kind, advertiser_id, page, page_size)
+        records = [normalize(record) for record in records]
+    else:
+        cached = await sync_to_async(api_cache.get_page)(kind, advertiser_id, page, page_size)
+        if cached is not None:
+            records, page_info = cached
+        else:
+            try:
+                records, page_info = await get_async_client().list_page(kind, advertiser_id, page, page_size)
+            except (httpx.HTTPError, TikTokAPIError) as e:
+                print(f"❌ Error fetching {kind}s: {e}")
+                return [], {}
+            records = [normalize(record) for record in records]
+            await sync_to_async(api_cache.set_page)(kind, advertiser_id, page, page_size, records, page_info)
+    index.store(kind, advertiser_id, f"{kind}_id", records)
+    return records, page_info
+
+
+async def afetch_by_ids(kind, advertiser_id, item_ids):
+    """
+    Async counterpart of ui_views.fetch_by_ids(); missing batches are
+    requested concurrently.
+    """
+    id_field = f"{kind}_id"
+    normalize = NORMALIZERS[kind]
+    item_ids = list(dict.fromkeys(str(item_id) for item_id in item_ids))
+    found = {}
+    if await sync_to_async(mirror.is_synced)(kind, advertiser_id):
+        rows = await sync_to_async(mirror.get_many)(kind, advertiser_id, item_ids)
+        found = {item_id: normalize(record) for item_id, record in rows.items()}
+    missing = [item_id for item_id in item_ids if item_id not in found]
+    found.update(index.get_many(kind, advertiser_id, missing))
+    missing = [item_id for item_id in missing if item_id not in found]
+    found.update(await sync_to_async(api_cache.get_records)(kind, advertiser_id, missing))
+    missing = [item_id for item_id in missing if item_id not in found]
+
+    client = get_async_client()
+    batches = list(chunked(missing, LOOKUP_BATCH_SIZE))
+    pages = await asyncio.gather(*(
+        client.list_page(kind, advertiser_id, page_size=len(batch), filtering={f"{id_field}s": batch})
+        for batch in batches
+    ), return_exceptions=True)
+    for page in pages:
+        if isinstance(page, Exception):
+            print(f"❌ Error fetching {kind} details: {page}")
+            continue
+        records = [normalize(record) for record in page[0]]
+        index.store(kind, advertiser_id, id_field, records)
+        await sync_to_async(api_cache.set_records)(kind, advertiser_id, records)
+        found.update((str(record.get(id_field)), record) for record in records)
+    return found
+
+
+async def aplan(kind, action, value, object_ids, advertiser_id):
+    """
+    Async counterpart of planner.plan_bulk_change().
+    """
+    from .planner import build_plan  # pulls in numpy
+
+    records = await afetch_by_ids(kind, advertiser_id, object_ids)
+    return build_plan(kind, action, value, object_ids, records)
+
+
+async def apaginate(request, kind):
+    advertiser_id = current_advertiser(request)
+    page_number, page_size = parse_page_args(request)
+    records, page_info = await afetch_page(kind, advertiser_id, page_number, page_size)
+    paginator = RemotePaginator(records, page_info.get("total_number", len(records)), page_size)
+    if page_number > paginator.num_pages:
+        page_number = paginator.num_pages
+        paginator.object_list, _ = await afetch_page(kind, advertiser_id, page_number, page_size)
+    return paginator.get_page(page_number)
+
+
+def parse_budget(value):
+    budget = float(value)
+    if budget < 0:
+        raise ValueError("Budget cannot be negative.")
+    return budget
+
+
+def parse_end_time(value, now):
+    end_dt = datetime.strptime(value, '%Y-%m-%dT%H:%M')
+    if end_dt <= now:
+        raise ValueError("End time must be in the future.")
+    return end_dt
+
+
+def starts_after(adgroup, end_dt):
+    """
+    True if the ad group's existing start time is not before `end_dt`.
+    """
+    existing_start = adgroup.get('schedule_start_time', 'N/A')
+    if existing_start == 'N/A':
+        return False
+    try:
+        return end_dt <= datetime.strptime(existing_start, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return False
+
+
+async def async_dashboard(request):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+
+    page_obj = await apaginate(request, "adgroup")
+    return conditional_render(request, 'dashboard.html', {
+        'user': request.user,
+        'page_obj': page_obj,
+        'no_adgroups': page_obj.paginator.count == 0,
+        'message': request.GET.get('message', None),
+        'error': request.GET.get('error', None)
+    }, page_obj)
+
+
+async def async_listing(request):
+    """
+    Displays a paginated list of campaigns with actions.
+    """
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+
+    page_obj = await apaginate(request, "campaign")
+    return conditional_render(request, 'listing.html', {
+        'page_obj': page_obj,
+        'export_columns': mirror.MIRRORS["campaign"][2],
+        'message': request.GET.get('message', None),
+        'error': request.GET.get('error', None)
+    }, page_obj)
+
+
+async def async_adgroup_listing(request):
+    """
+    Displays a paginated list of ad groups.
+    """
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+
+    page_obj = await apaginate(request, "adgroup")
+    return conditional_render(request, 'adgroup_listing.html', {
+        'page_obj': page_obj,
+        'no_adgroups': page_obj.paginator.count == 0,
+        'export_columns': mirror.MIRRORS["adgroup"][2],
+        'message': request.GET.get('message', None),
+        'error': request.GET.get('error', None)
+    }, page_obj)
+
+
+async def async_campaign_detail(request, campaign_id):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    campaign = (await afetch_by_ids("campaign", advertiser_id, [campaign_id])).get(str(campaign_id))
+    if not campaign:
+        return redirect('async_dashboard')
+    return render(request, 'campaign_detail.html', {'campaign': campaign})
+
+
+async def async_adgroup_detail(request, adgroup_id):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    adgroup = (await afetch_by_ids("adgroup", advertiser_id, [adgroup_id])).get(str(adgroup_id))
+    if not adgroup:
+        return redirect('async_adgroup_listing')
+    return render(request, 'adgroup_detail.html', {'adgroup': adgroup})
+
+
+async def async_campaign_update(request, campaign_id):
+    """
+    Updates only the budget of a selected campaign.
+    """
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    campaign = (await afetch_by_ids("campaign", advertiser_id, [campaign_id])).get(str(campaign_id))
+    if not campaign:
+        return redirect('async_dashboard')
+
+    if request.method == 'POST':
+        try:
+            budget = parse_budget(request.POST.get('budget'))
+        except (TypeError, ValueError) as e:
+            return render(request, 'campaign_update.html', {'campaign': campaign, 'error': f"Invalid budget: {e}"})
+
+        response = await get_async_client().post("campaign/update/", {
+            "advertiser_id": advertiser_id,
+            "campaign_id": campaign_id,
+            "budget": budget
+        })
+        # TikTok rejects writes with HTTP 200 and a non-zero `code`.
+        failure = response_error(response)
+        if failure is None:
+            await sync_to_async(record_write)("campaign", advertiser_id, [campaign_id], budget=budget)
+            return redirect('async_listing')
+        return render(request, 'campaign_update.html', {'campaign': campaign,
+                                                        'error': f"Failed to update campaign: {failure}"})
+
+    return render(request, 'campaign_update.html', {'campaign': campaign})
+
+
+async def async_adgroup_update(request, adgroup_id):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    adgroup = (await afetch_by_ids("adgroup", advertiser_id, [adgroup_id])).get(str(adgroup_id))
+    if not adgroup:
+        return redirect('async_dashboard')
+
+    now = datetime.now()
+    if request.method != 'POST':
+        return render(request, 'adgroup_update.html', {'adgroup': adgroup, 'current_datetime': now})
+
+    def error(message):
+        return render(request, 'adgroup_update.html', {'adgroup': adgroup, 'current_datetime': now, 'error': message})
+
+    try:
+        budget = parse_budget(request.POST.get('budget'))
+        end_dt = parse_end_time(request.POST.get('schedule_end'), now)
+    except (TypeError, ValueError) as e:
+        return error(f"Invalid input: {e}")
+    if starts_after(adgroup, end_dt):
+        return error("Invalid end date: End time must be after the existing start time.")
+
+    api_end = end_dt.strftime('%Y-%m-%d %H:%M:00')
+    response = await get_async_client().post("adgroup/update/", {
+        "advertiser_id": advertiser_id,
+        "adgroup_id": adgroup_id,
+        "schedule_type": "SCHEDULE_START_END",
+        "schedule_end_time": api_end,
+        "budget": budget,
+    })
+    failure = response_error(response)
+    if failure is None:
+        await sync_to_async(record_write)("adgroup", advertiser_id, [adgroup_id], budget=budget, schedule_end_time=api_end)
+        success_message = f"Ad Group ID {adgroup_id} has been updated: Budget ${budget:.2f}, Schedule End {api_end}"
+        return redirect(f"/async/dashboard/?message={quote(success_message)}")
+    return error(f"Update failed: {failure}")
+
+
+async def async_bulk_update(request):
+    """
+    Handles bulk updates of campaign budgets.
+    """
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
+
+    error = None
+    if request.method == 'POST':
+        try:
+            new_budget = parse_budget(request.POST.get('new_budget'))
+        except (TypeError, ValueError) as e:
+            error = f"Invalid budget value: {e}"
+        else:
+            if request.POST.get('confirm') == "1" and request.POST.getlist('campaign_ids'):
+                job = await sync_to_async(submit_job)("campaign", BulkJob.BUDGET, new_budget, request.POST.getlist('campaign_ids'),
+                                                      advertiser_id, request.user)
+                return redirect('job_detail', job_id=job.pk)
+            plan = await aplan("campaign", BulkJob.BUDGET, new_budget, request.POST.getlist('campaign_ids'), advertiser_id)
+            return render_plan(request, plan, 'campaign_ids', 'new_budget', 'async_bulk_update')
+
+    return render(request, 'bulk_update.html', {'page_obj': await apaginate(request, "campaign"), 'error': error})
+
+
+async def async_adgroup_bulk_update(request):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
+
+    error = None
+    if request.method == 'POST':
+        try:
+            new_budget = parse_budget(request.POST.get('new_budget'))
+        except (TypeError, ValueError) as e:
+            error = f"Invalid budget value: {e}"
+        else:
+            if request.POST.get('confirm') == "1" and request.POST.getlist('adgroup_ids'):
+                job = await sync_to_async(submit_job)("adgroup", BulkJob.BUDGET, new_budget, request.POST.getlist('adgroup_ids'),
+                                                      advertiser_id, request.user)
+                return redirect('job_detail', job_id=job.pk)
+            plan = await aplan("adgroup", BulkJob.BUDGET, new_budget, request.POST.getlist('adgroup_ids'), advertiser_id)
+            return render_plan(request, plan, 'adgroup_ids', 'new_budget', 'async_adgroup_bulk_update')
+
+    page_obj = await apaginate(request, "adgroup")
+    return render(request, 'adgroup_bulk_update.html', {
+        'page_obj': page_obj,
+        'no_adgroups': page_obj.paginator.count == 0,
+        'error': error
+    })
+
+
+async def async_adgroup_bulk_update_schedule(request):
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
+
+    error = None
+    if request.method == 'POST':
+        selected_adgroups = request.POST.getlist('adgroup_ids')
+        try:
+            end_dt = parse_end_time(request.POST.get('schedule_end'), datetime.now())
+        except (TypeError, ValueError) as e:
+            error = str(e)
+        else:
+            api_end = end_dt.strftime('%Y-%m-%d %H:%M:00')
+            if request.POST.get('confirm') == "1" and selected_adgroups:
+                job = await sync_to_async(submit_job)("adgroup", BulkJob.SCHEDULE_END, api_end, selected_adgroups,
+                                                      advertiser_id, request.user)
+                return redirect('job_detail', job_id=job.pk)
+            plan = await aplan("adgroup", BulkJob.SCHEDULE_END, api_end, selected_adgroups, advertiser_id)
+            return render_plan(request, plan, 'adgroup_ids', 'schedule_end', 'async_adgroup_bulk_update_schedule')
+
+    page_obj = await apaginate(request, "adgroup")
+    return render(request, 'adgroup_bulk_update_schedule.html', {
+        'page_obj': page_obj,
+        'no_adgroups': page_obj.paginator.count == 0,
+        'error': error
+    })
+
+
+async def accounts_overview(request):
+    """
+    Campaign and ad group counts for every account the user manages. The
+    accounts are queried concurrently, so the page takes as long as the
+    slowest account rather than the sum of all of them.
+    """
+    if not await authenticated_user(request):
+        return redirect('ui_login')
+    accounts = user_accounts(request)
+    pages = await asyncio.gather(*(
+        afetch_page(kind, advertiser_id, 1, 1)
+        for advertiser_id, _ in accounts
+        for kind in ("campaign", "adgroup")
+    ))
+    overview = []
+    for (advertiser_id, name), campaigns, adgroups in zip(accounts, pages[::2], pages[1::2]):
+        overview.append({
+            'advertiser_id': advertiser_id,
+            'name': name,
+            'campaigns': campaigns[1].get('total_number'),
+            'adgroups': adgroups[1].get('total_number'),
+        })
+    return render(request, 'accounts_overview.html', {'accounts': overview})
@@ -0,0 +1,110 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, user_logged_out
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+UserModel = get_user_model()
+
+
+def auth_cache():
+    """
+    The shared cache holding users, tokens and accounts, or None when
+    AUTH_CACHE_ALIAS is unset and they're always read from the database.
+    """
+    return caches[settings.AUTH_CACHE_ALIAS] if settings.AUTH_CACHE_ALIAS else None
+
+
+def _load_user(user_id):
+    try:
+        return UserModel._default_manager.get(pk=user_id)
+    except (UserModel.DoesNotExist, ValueError):
+        return None
+
+
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def token_key(key):
+    # Tokens are credentials; don't leave them readable in a shared cache.
+    return f"auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_cached_user(user_id):
+    """
+    Return the user with `user_id` from the cache, loading it on a miss, or
+    None if there is no such user.
+    """
+    cache = auth_cache()
+    if cache is None:
+        return _load_user(user_id)
+    user = cache.get(user_key(user_id))
+    if user is None:
+        user = _load_user(user_id)
+        if user is not None:
+            cache_user(user)
+    return user
+
+
+def cache_user(user):
+    cache = auth_cache()
+    if cache is not None:
+        cache.set(user_key(user.pk), user, settings.AUTH_USER_CACHE_TTL)
+
+
+def cached_token_user_id(key):
+    """
+    Return the id of the user API token `key` belongs to, if cached.
+    """
+    cache = auth_cache()
+    return cache.get(token_key(key)) if cache is not None else None
+
+
+def cache_token(key, user):
+    cache = auth_cache()
+    if cache is not None:
+        cache_user(user)
+        cache.set(token_key(key), user.pk, settings.AUTH_CACHE_TTL)
+
+
+def forget_user(user_id):
+    cache = auth_cache()
+    if cache is not None:
+        cache.delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that resolves the session's user from the cache, so a
+    warm request doesn't query auth_user.
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def _user_changed(sender, instance, **kwargs):
+    # Covers password changes too: get_user() checks the session hash
+    # against the cached copy.
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def _user_logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+# A lazy sender, so connecting this doesn't import DRF on startup.
+@receiver(post_delete, sender='authtoken.Token')
+def _token_revoked(sender, instance, **kwargs):
+    cache = auth_cache()
+    if cache is not None:
+        cache.delete(token_key(instance.key))
@@ -0,0 +1,31 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .auth import cache_token, cached_token_user_id, get_cached_user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches which user a token belongs to, and the
+    user, so a warm API request doesn't query the database.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        user_id = cached_token_user_id(key)
+        if user_id is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            cache_token(key, user)
+        else:
+            user = get_cached_user(user_id)
+            token = model(key=key, user=user) if user is not None else None
+
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
+
@@ -0,0 +1,50 @@
+"""
+Time a cold start of the WSGI entry point: import it, then serve one GET.
+
+Run in a fresh interpreter (`python -m campaigns.benchmark.coldstart /path`);
+prints the timings as JSON on the last line of stdout.
+"""
+import io
+import json
+import sys
+import time
+
+
+def main(path="/"):
+    start = time.perf_counter()
+    from tiktok.wsgi import application
+    imported = time.perf_counter()
+
+    from django.db import connection
+
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "127.0.0.1",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": sys.stderr,
+    }
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b"".join(response)
+    finally:
+        response.close()
+    served = time.perf_counter()
+
+    print(json.dumps({
+        "status": int(statuses[0].split()[0]),
+        "import_ms": round((imported - start) * 1000, 2),
+        "first_request_ms": round((served - imported) * 1000, 2),
+        "total_ms": round((served - start) * 1000, 2),
+        "db_connected": connection.connection is not None,
+        "modules": len(sys.modules),
+    }))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
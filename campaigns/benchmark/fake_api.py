@@ -0,0 +1,232 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/open_api/v1.3/"
+
+
+def build_account(adgroup_count, campaign_count=None, seed=0):
+    """
+    Generate `(campaigns, adgroups)` for a synthetic account, keyed by id.
+    """
+    rng = random.Random(seed)
+    campaign_count = campaign_count or max(1, adgroup_count // 20)
+    campaigns = {}
+    for i in range(campaign_count):
+        campaign_id = str(1700000000000 + i)
+        campaigns[campaign_id] = {
+            "campaign_id": campaign_id,
+            "campaign_name": f"Campaign {i}",
+            "budget": float(rng.randrange(50, 5000)),
+            "operation_status": "ENABLE",
+            "secondary_status": "CAMPAIGN_STATUS_ENABLE",
+            "modify_time": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 00:00:00",
+        }
+    campaign_ids = list(campaigns)
+    adgroups = {}
+    for i in range(adgroup_count):
+        adgroup_id = str(1800000000000 + i)
+        adgroups[adgroup_id] = {
+            "adgroup_id": adgroup_id,
+            "adgroup_name": f"Ad group {i}",
+            "campaign_id": campaign_ids[i % campaign_count],
+            "budget": float(rng.randrange(20, 1000)),
+            "schedule_start_time": "2024-01-01 00:00:00",
+            "schedule_end_time": "2030-01-01 00:00:00",
+            "operation_status": "ENABLE",
+            "secondary_status": "ADGROUP_STATUS_DELIVERY_OK",
+            "modify_time": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 00:00:00",
+        }
+    return campaigns, adgroups
+
+
+class FakeTikTokAPI:
+    """
+    Local stand-in for the `/open_api/v1.3` campaign and ad group endpoints.
+
+    Serves `{kind}/get/` (with `page`, `page_size` and id `filtering`),
+    `{kind}/update/`, `{kind}/update/status/` and a daily ad group
+    `report/integrated/get/` from an in-memory account.
+    Every call waits `latency` seconds, and an `error_rate` fraction of them
+    get an HTTP 503, so the client's retries are exercised too.
+    """
+
+    def __init__(self, adgroup_count=1000, campaign_count=None, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.store = dict(zip(("campaign", "adgroup"), build_account(adgroup_count, campaign_count, seed)))
+        # Ids to pick requests from; deleted objects stay in here on purpose.
+        self.ids = {kind: list(records) for kind, records in self.store.items()}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{API_PREFIX.rstrip('/')}"
+
+    def start(self, port=0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls.clear()
+
+    def call_count(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def sample_ids(self, kind, count):
+        return self.rng.sample(self.ids[kind], min(count, len(self.ids[kind])))
+
+    def handle(self, method, path, params):
+        """
+        Return `(status, body)` for one API call.
+        """
+        with self.lock:
+            self.calls[path] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return 503, {"code": 50002, "message": "Service busy"}
+
+        if method == "GET" and path == "report/integrated/get/":
+            return 200, self.report(params)
+        kind, _, action = path.partition("/")
+        if kind not in self.store:
+            return 404, {"code": 40001, "message": f"Unknown endpoint {path}"}
+        if method == "GET" and action == "get/":
+            return 200, self.list(kind, params)
+        if method == "POST" and action == "update/":
+            return 200, self.update(kind, params)
+        if method == "POST" and action == "update/status/":
+            return 200, self.update_status(kind, params)
+        return 404, {"code": 40001, "message": f"Unknown endpoint {path}"}
+
+    def list(self, kind, params):
+        records = self.store[kind]
+        filtering = json.loads(params.get("filtering") or "{}")
+        item_ids = filtering.get(f"{kind}_ids")
+        rows = [records[i] for i in item_ids if i in records] if item_ids else list(records.values())
+        page = int(params.get("page", 1))
+        page_size = int(params.get("page_size", 10))
+        return {"code": 0, "message": "OK", "data": {
+            "list": rows[(page - 1) * page_size:page * page_size],
+            "page_info": {
+                "page": page,
+                "page_size": page_size,
+                "total_number": len(rows),
+                "total_page": max(1, -(-len(rows) // page_size)),
+            },
+        }}
+
+    def report(self, params):
+        """
+        Daily ad group rows for `start_date`..`end_date`; row r is ad group
+        r // days on day r % days, generated on demand for the requested page.
+        """
+        start = date.fromisoformat(params["start_date"])
+        days = (date.fromisoformat(params["end_date"]) - start).days + 1
+        adgroup_ids = self.ids["adgroup"]
+        page = int(params.get("page", 1))
+        page_size = int(params.get("page_size", 10))
+        total = len(adgroup_ids) * days
+        rows = []
+        for r in range((page - 1) * page_size, min(page * page_size, total)):
+            adgroup = self.store["adgroup"].get(adgroup_ids[r // days])
+            if adgroup is None:
+                continue
+            impressions = 1000 + (r * 7919) % 9000
+            clicks = impressions // (20 + r % 30)
+            spend = round(impressions * 0.004, 2)
+            rows.append({
+                "dimensions": {
+                    "adgroup_id": adgroup["adgroup_id"],
+                    "stat_time_day": f"{start + timedelta(days=r % days)} 00:00:00",
+                },
+                "metrics": {
+                    "spend": str(spend),
+                    "impressions": str(impressions),
+                    "clicks": str(clicks),
+                    "conversion": str(clicks // 10),
+                    "complete_payment_roas": str(round(0.5 + (r % 25) / 10, 2)),
+                    "adgroup_name": adgroup["adgroup_name"],
+                    "campaign_id": adgroup["campaign_id"],
+                    "campaign_name": self.store["campaign"].get(adgroup["campaign_id"], {}).get("campaign_name", ""),
+                },
+            })
+        return {"code": 0, "message": "OK", "data": {
+            "list": rows,
+            "page_info": {
+                "page": page,
+                "page_size": page_size,
+                "total_number": total,
+                "total_page": max(1, -(-total // page_size)),
+            },
+        }}
+
+    def update(self, kind, payload):
+        record = self.store[kind].get(str(payload.get(f"{kind}_id")))
+        if record is None:
+            return {"code": 40002, "message": "Not found"}
+        with self.lock:
+            record.update({key: value for key, value in payload.items() if key in record and not key.endswith("_id")})
+        return {"code": 0, "message": "OK", "data": {}}
+
+    def update_status(self, kind, payload):
+        ids_key = f"{kind}_ids"
+        records = self.store[kind]
+        changed = [str(i) for i in payload.get(ids_key, []) if str(i) in records]
+        with self.lock:
+            for item_id in changed:
+                if payload.get("opt_type") == "DELETE":
+                    del records[item_id]
+                else:
+                    records[item_id]["operation_status"] = payload.get("opt_type")
+        return {"code": 0, "message": "OK", "data": {ids_key: changed}}
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, delayed
+        # ACKs add ~40 ms to every keep-alive call.
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self.respond(*api.handle("GET", url.path[len(API_PREFIX):], params))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            self.respond(*api.handle("POST", url.path[len(API_PREFIX):], payload))
+
+        def respond(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
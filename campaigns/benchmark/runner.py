@@ -0,0 +1,205 @@
+from io import StringIO
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import resolve
+
+from .. import reporting, search
+from ..jobs import run_job
+from ..models import BulkJob, SyncState
+from ..record_index import index
+from .fake_api import FakeTikTokAPI
+
+# The fake account every run uses, whatever TIKTOK_ADVERTISER_ID is set to.
+ADVERTISER_ID = "7000000000000000000"
+
+
+def _get(path):
+    def request(client, api, bulk_size):
+        return client.get(path)
+    return request
+
+
+def _revalidate(path):
+    """
+    Reload `path` the way a browser does, sending back the last ETag.
+    """
+    etags = {}
+
+    def request(client, api, bulk_size):
+        response = client.get(path, HTTP_IF_NONE_MATCH=etags.get("etag", ""))
+        etags["etag"] = response.get("ETag", "")
+        return response
+    return request
+
+
+def _adgroup_detail(client, api, bulk_size):
+    adgroup_id, = api.sample_ids("adgroup", 1)
+    return client.get(f"/adgroups/detail/{adgroup_id}/")
+
+
+def _bulk(path, kind, ids_field, data):
+    def request(client, api, bulk_size):
+        return client.post(path, {ids_field: api.sample_ids(kind, bulk_size), "confirm": "1", **data})
+    return request
+
+
+# name -> request(client, api, bulk_size). Bulk views answer with a redirect
+# to the job they queued; the job itself is timed separately as "<name> job".
+SCENARIOS = {
+    "dashboard": _get("/dashboard/"),
+    "listing": _get("/campaigns/listing/"),
+    "adgroup_listing": _get("/adgroups/"),
+    "dashboard_revalidate": _revalidate("/dashboard/"),
+    "adgroup_detail": _adgroup_detail,
+    "report": _get("/reports/?level=campaign&compare=1"),
+    "adgroup_search": _get("/adgroups/search/?q=group+12&status=ENABLE&budget_min=50&sort=budget&order=desc"),
+    "campaign_bulk_update": _bulk("/campaigns/bulk_update/", "campaign", "campaign_ids", {"new_budget": "150"}),
+    "adgroup_bulk_update": _bulk("/adgroups/bulk_update/", "adgroup", "adgroup_ids", {"new_budget": "75"}),
+    "adgroup_bulk_update_schedule": _bulk("/adgroup/bulk-update-schedule/", "adgroup", "adgroup_ids",
+                                          {"schedule_end": "2031-06-30T12:00"}),
+    "adgroup_bulk_status": _bulk("/adgroups/bulk_status/", "adgroup", "adgroup_ids", {"opt_type": "DISABLE"}),
+}
+
+
+def summarize(samples):
+    """
+    Return p50/p95/max of a list of millisecond timings.
+    """
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    index.clear()
+    reporting.clear()
+    search.clear()
+
+
+def measure(name, request, client, api, iterations, bulk_size):
+    """
+    Time `iterations` calls of one scenario starting from cold caches.
+
+    Returns latency percentiles, the cold (first) call, upstream calls per
+    request and the peak Python allocation of one extra traced call.
+    """
+    clear_caches()
+    timings, calls, job_timings, job_calls = [], [], [], []
+    for _ in range(iterations):
+        api.reset_calls()
+        start = time.perf_counter()
+        response = request(client, api, bulk_size)
+        timings.append((time.perf_counter() - start) * 1000)
+        calls.append(api.call_count())
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} answered HTTP {response.status_code}")
+
+        match = resolve(response.url) if response.status_code == 302 else None
+        if match and match.url_name == "job_detail":
+            api.reset_calls()
+            start = time.perf_counter()
+            run_job(BulkJob.objects.get(pk=match.kwargs["job_id"]))
+            job_timings.append((time.perf_counter() - start) * 1000)
+            job_calls.append(api.call_count())
+
+    tracemalloc.start()
+    request(client, api, bulk_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {name: {
+        **summarize(timings),
+        "cold_ms": round(timings[0], 2),
+        "upstream_calls": round(statistics.mean(calls), 2),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }}
+    if job_timings:
+        results[f"{name} job"] = {
+            **summarize(job_timings),
+            "cold_ms": round(job_timings[0], 2),
+            "upstream_calls": round(statistics.mean(job_calls), 2),
+        }
+    return results
+
+
+def cold_start(path="/"):
+    """
+    Import the WSGI entry point in a fresh interpreter, serve one GET of
+    `path` and return the child's timings.
+    """
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "tiktok.settings")}
+    process = subprocess.run([sys.executable, "-m", "campaigns.benchmark.coldstart", path], cwd=settings.BASE_DIR,
+                             env=env, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f"Cold start of {path} failed:\n{process.stderr}")
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def measure_cold_start(iterations, path="/"):
+    """
+    Time `iterations` cold starts serving `path`, split into importing the
+    WSGI application and answering the first request.
+    """
+    runs = [cold_start(path) for _ in range(iterations)]
+    for run in runs:
+        if run["status"] >= 400:
+            raise RuntimeError(f"Cold start of {path} answered HTTP {run['status']}")
+    return {
+        phase: {
+            **summarize([run[f"{phase}_ms"] for run in runs]),
+            "upstream_calls": 0,
+            "db_connected": any(run["db_connected"] for run in runs),
+        }
+        for phase in ("import", "first_request", "total")
+    }
+
+
+def run_benchmark(sizes, scenarios=None, iterations=20, latency=0.0, error_rate=0.0,
+                  bulk_size=100, rate_limit=False, use_mirror=False, seed=0):
+    """
+    Benchmark the views against a fake TikTok account of each size in `sizes`.
+
+    With `use_mirror` the account is synced into the local mirror first,
+    otherwise any existing mirror is ignored and every read goes upstream.
+    Everything runs in a rolled-back transaction, so the users, jobs and
+    mirror rows it creates never reach the database.
+    """
+    results = {}
+    for size in sizes:
+        api = FakeTikTokAPI(adgroup_count=size, latency=latency, error_rate=error_rate, seed=seed).start()
+        try:
+            with override_settings(TIKTOK_BASE_URL=api.base_url, TIKTOK_ADVERTISER_ID=ADVERTISER_ID,
+                                   TIKTOK_RATELIMIT_ENABLED=rate_limit, ALLOWED_HOSTS=["testserver"]), \
+                    transaction.atomic():
+                SyncState.objects.filter(advertiser_id=ADVERTISER_ID).delete()
+                if use_mirror:
+                    call_command("sync_tiktok", advertiser=ADVERTISER_ID, stdout=StringIO())
+                user = User.objects.create_user(username="benchmark-user", password=None)
+                client = Client()
+                client.force_login(user)
+                size_results = {}
+                for name in scenarios or SCENARIOS:
+                    size_results.update(measure(name, SCENARIOS[name], client, api, iterations, bulk_size))
+                results[str(size)] = size_results
+                transaction.set_rollback(True)
+        finally:
+            api.stop()
+            clear_caches()
+    return results
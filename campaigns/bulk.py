@@ -0,0 +1,147 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from django.conf import settings
+
+from .metrics import propagate
+from .tiktok_client import api_code, get_client
+
+# Largest id list each TikTok status endpoint accepts in one call.
+STATUS_BATCH_SIZES = {"campaign": 20, "adgroup": 100}
+STATUS_OPERATIONS = ("ENABLE", "DISABLE", "DELETE")
+
+
+class BulkResult:
+    """
+    Per-id outcome of a bulk dispatch.
+    """
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = {}
+
+    def add(self, item_id, error):
+        if error is None:
+            self.succeeded.append(item_id)
+        else:
+            self.failed[item_id] = error
+
+    def error_summary(self):
+        return ', '.join(f"{item_id} ({error})" for item_id, error in self.failed.items())
+
+
+def response_error(response):
+    """
+    Return None if a TikTok write succeeded, otherwise a short error message.
+    """
+    if response.status_code == 204:
+        return None
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}"
+    try:
+        data = response.json()
+    except ValueError:
+        return "Invalid response"
+    if data.get("code") == 0:
+        return None
+    return data.get("message") or f"API code {api_code(response)}"
+
+
+def dispatch(item_ids, send, max_workers=None):
+    """
+    Call `send(item_id)` for every unique id on a bounded thread pool.
+
+    `send` returns the upstream response; the results are collected in input
+    order into a single BulkResult.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    result = BulkResult()
+    if not item_ids:
+        return result
+
+    def run(item_id):
+        try:
+            return response_error(send(item_id))
+        except requests.exceptions.RequestException as e:
+            return f"Request failed: {e}"
+
+    max_workers = max_workers or settings.TIKTOK_BULK_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(item_ids))) as pool:
+        for item_id, error in zip(item_ids, pool.map(propagate(run), item_ids)):
+            result.add(item_id, error)
+    return result
+
+
+
+async def adispatch(item_ids, send, max_workers=None):
+    """
+    Async counterpart of dispatch(): awaits `send(item_id)` for every unique
+    id with at most `max_workers` calls in flight.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    result = BulkResult()
+    semaphore = asyncio.Semaphore(max_workers or settings.TIKTOK_BULK_CONCURRENCY)
+
+    async def run(item_id):
+        async with semaphore:
+            try:
+                return response_error(await send(item_id))
+            except httpx.HTTPError as e:
+                return f"Request failed: {e}"
+
+    errors = await asyncio.gather(*(run(item_id) for item_id in item_ids))
+    for item_id, error in zip(item_ids, errors):
+        result.add(item_id, error)
+    return result
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def dispatch_status(kind, item_ids, opt_type, advertiser_id, max_workers=None):
+    """
+    Change the status of many campaigns or ad groups (`kind`) in as few calls
+    as possible.
+
+    Ids are split into maximum-size batches for `{kind}/update/status/`, the
+    batches are sent concurrently, and every id's outcome is mapped back into
+    one BulkResult.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    result = BulkResult()
+    if not item_ids:
+        return result
+
+    ids_key = f"{kind}_ids"
+    batches = list(chunked(item_ids, STATUS_BATCH_SIZES[kind]))
+
+    def run(batch):
+        try:
+            response = get_client().post(f"{kind}/update/status/", {
+                "advertiser_id": advertiser_id,
+                ids_key: batch,
+                "opt_type": opt_type,
+            })
+        except requests.exceptions.RequestException as e:
+            return None, f"Request failed: {e}"
+        error = response_error(response)
+        if error:
+            return None, error
+        # TikTok echoes the ids it changed; anything missing was rejected.
+        changed = response.json().get("data", {}).get(ids_key)
+        return ({str(item_id) for item_id in changed} if changed is not None else set(batch)), None
+
+    max_workers = max_workers or settings.TIKTOK_BULK_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        for batch, (changed, error) in zip(batches, pool.map(propagate(run), batches)):
+            for item_id in batch:
+                if error:
+                    result.add(item_id, error)
+                elif item_id in changed:
+                    result.add(item_id, None)
+                else:
+                    result.add(item_id, "Not updated")
+    return result
@@ -0,0 +1,67 @@
+import hashlib
+from pathlib import Path
+
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .accounts import current_advertiser, user_accounts
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+_template_version = None
+
+
+def template_version():
+    """
+    Digest of the app's templates, so a deploy that changes the markup
+    invalidates pages browsers still hold. The same on every instance.
+    """
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.md5()
+        for path in sorted(TEMPLATE_DIR.glob("*.html")):
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+        _template_version = digest.hexdigest()
+    return _template_version
+
+
+def page_etag(request, page_obj):
+    """
+    Return the ETag of a listing page.
+
+    It covers every value of the records shown (`modify_time` alone only
+    has one-second resolution), the total count, and everything else the page depends on: the URL, the user, their
+    accounts and the CSRF secret the page's forms are tied to. There is no
+    Last-Modified: the newest `modify_time` doesn't move when a row is
+    deleted or shifts off the page, so it would answer 304 to stale copies.
+    """
+    # get_token() makes sure there is a secret (and that it gets set as a
+    # cookie); the token it returns is masked differently on every call.
+    get_token(request)
+    digest = hashlib.md5()
+    for part in (template_version(), request.get_full_path(), request.user.pk, user_accounts(request),
+                 current_advertiser(request), request.META["CSRF_COOKIE"], page_obj.paginator.count):
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    for record in page_obj.object_list:
+        digest.update(repr(sorted(record.items(), key=lambda item: item[0])).encode())
+        digest.update(b"\n")
+    return quote_etag(digest.hexdigest())
+
+
+def conditional_render(request, template_name, context, page_obj):
+    """
+    Like render(), but answers 304 Not Modified, without rendering anything,
+    when the client's `If-None-Match` still matches.
+    """
+    etag = page_etag(request, page_obj)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render(request, template_name, context)
+    response.headers["ETag"] = etag
+    # Let browsers keep the page but check back every time.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,86 @@
+import csv
+import json
+from itertools import chain
+
+from . import mirror
+from .streaming import iter_records
+
+# Export format -> content type.
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# Approximate size of each streamed block, in characters.
+CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """
+    File-like object whose write() hands the line back, so csv.writer can
+    format rows for a streaming response without buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def columns_for(kind, requested):
+    """
+    Validate the requested columns against the exportable fields of `kind`;
+    no request means every field. Raises ValueError on an unknown column.
+    """
+    available = mirror.MIRRORS[kind][2]
+    columns = [column for value in requested for column in value.split(",") if column]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Choose from {', '.join(available)}.")
+    return list(dict.fromkeys(columns)) or list(available)
+
+
+def records(kind, advertiser_id):
+    """
+    Yield every campaign or ad group, from the mirror once it is synced and
+    otherwise page by page from TikTok.
+    """
+    if mirror.is_synced(kind, advertiser_id):
+        return mirror.iter_records(kind, advertiser_id)
+    return iter_records(kind, advertiser_id)
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row.get(column, "") for column in columns])
+
+
+def ndjson_lines(rows, columns):
+    for row in rows:
+        yield json.dumps({column: row.get(column) for column in columns}) + "\n"
+
+
+def export_lines(kind, advertiser_id, columns, format="csv"):
+    """
+    Return an iterator of CSV or NDJSON lines for the whole account.
+
+    The first record is read before returning, so a TikTok failure on the
+    first page surfaces here as an exception instead of as a truncated file.
+    """
+    rows = iter(records(kind, advertiser_id))
+    first = next(rows, None)
+    if first is not None:
+        rows = chain([first], rows)
+    return buffered((csv_lines if format == "csv" else ndjson_lines)(rows, columns))
+
+
+def buffered(lines, size=CHUNK_SIZE):
+    """
+    Join lines into chunks of about `size` characters, so the server writes a
+    few large blocks instead of one per row.
+    """
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk)
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import requests
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .bulk import chunked, dispatch, dispatch_status
+from .models import BulkJob, BulkJobItem
+from .tiktok_client import TikTokAPIError, get_client
+from .writes import record_delete, record_write
+
+# Items are dispatched and saved in chunks so progress shows up while a job runs.
+PROGRESS_CHUNK_SIZE = 50
+
+
+def submit_job(object_type, action, value, object_ids, advertiser_id, user=None):
+    """
+    Store a bulk change for the worker and return the new BulkJob.
+    """
+    job = BulkJob.objects.create(
+        advertiser_id=advertiser_id,
+        object_type=object_type,
+        action=action,
+        value=str(value),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    BulkJobItem.objects.bulk_create([
+        BulkJobItem(job=job, object_id=object_id) for object_id in dict.fromkeys(object_ids)
+    ])
+    return job
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to running and return it, or None.
+    """
+    for job in BulkJob.objects.filter(status=BulkJob.PENDING).order_by('created_at')[:10]:
+        now = timezone.now()
+        claimed = BulkJob.objects.filter(pk=job.pk, status=BulkJob.PENDING).update(
+            status=BulkJob.RUNNING, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Put running jobs whose worker hasn't reported for `timeout` seconds back
+    in the queue, and return how many there were.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return BulkJob.objects.filter(stale, status=BulkJob.RUNNING).update(status=BulkJob.PENDING)
+
+
+def _heartbeat(job):
+    job.heartbeat_at = timezone.now()
+    BulkJob.objects.filter(pk=job.pk).update(heartbeat_at=job.heartbeat_at)
+
+
+def job_progress(job):
+    """
+    Return the job's state and per-id results as a JSON-serialisable dict.
+    """
+    counts = dict(job.items.values_list('status').annotate(n=Count('pk')))
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "error": job.error,
+        "total": sum(counts.values()),
+        "pending": counts.get(BulkJobItem.PENDING, 0),
+        "succeeded": counts.get(BulkJobItem.SUCCEEDED, 0),
+        "failed": counts.get(BulkJobItem.FAILED, 0),
+        "skipped": counts.get(BulkJobItem.SKIPPED, 0),
+        "items": list(job.items.values('object_id', 'status', 'error')),
+    }
+
+
+def _save_results(job, result):
+    items = {item.object_id: item for item in job.items.filter(object_id__in=list(result.succeeded) + list(result.failed))}
+    for object_id in result.succeeded:
+        items[object_id].status = BulkJobItem.SUCCEEDED
+    for object_id, error in result.failed.items():
+        items[object_id].status = BulkJobItem.FAILED
+        items[object_id].error = error
+    BulkJobItem.objects.bulk_update(items.values(), ['status', 'error'])
+
+
+def _fail_items(job, errors):
+    items = list(job.items.filter(object_id__in=list(errors)))
+    for item in items:
+        item.status = BulkJobItem.FAILED
+        item.error = errors[item.object_id]
+    BulkJobItem.objects.bulk_update(items, ['status', 'error'])
+
+
+def _skip_items(job, object_ids):
+    job.items.filter(object_id__in=list(object_ids)).update(status=BulkJobItem.SKIPPED)
+
+
+def run_job(job):
+    """
+    Send every pending item of a claimed job and record the outcome per id.
+    """
+    from .planner import plan_bulk_change
+
+    kind = job.object_type
+    id_field = f"{kind}_id"
+    client = get_client()
+    try:
+        pending = list(job.items.filter(status=BulkJobItem.PENDING).values_list('object_id', flat=True))
+        for batch in chunked(pending, PROGRESS_CHUNK_SIZE):
+            _heartbeat(job)
+            if job.action == BulkJob.STATUS:
+                result = dispatch_status(kind, batch, job.value, job.advertiser_id)
+                if job.value == "DELETE":
+                    record_delete(kind, job.advertiser_id, result.succeeded)
+                else:
+                    record_write(kind, job.advertiser_id, result.succeeded, operation_status=job.value)
+            else:
+                # Re-plan against TikTok's current state, bypassing the caches:
+                # objects may have changed since the user confirmed, and only
+                # real deltas are sent.
+                try:
+                    plan = plan_bulk_change(kind, job.action, job.value, batch, job.advertiser_id, fresh=True)
+                except (requests.exceptions.RequestException, TikTokAPIError) as e:
+                    # The lookup failed, not the objects: report the error
+                    # rather than calling them missing, and go on with the
+                    # next chunk.
+                    _fail_items(job, {object_id: f"Lookup failed: {e}" for object_id in batch})
+                    continue
+                _fail_items(job, plan.invalid)
+                _skip_items(job, plan.unchanged)
+                if job.action == BulkJob.BUDGET:
+                    budget = plan.target
+                    result = dispatch(plan.change_ids, lambda object_id: client.post(f"{kind}/update/", {
+                        "advertiser_id": job.advertiser_id,
+                        id_field: object_id,
+                        "budget": budget,
+                    }))
+                    record_write(kind, job.advertiser_id, result.succeeded, budget=budget)
+                else:
+                    result = dispatch(plan.change_ids, lambda object_id: client.post("adgroup/update/", {
+                        "advertiser_id": job.advertiser_id,
+                        "adgroup_id": object_id,
+                        "schedule_type": "SCHEDULE_START_END",
+                        "schedule_end_time": job.value,
+                    }))
+                    record_write(kind, job.advertiser_id, result.succeeded, schedule_end_time=job.value)
+            _save_results(job, result)
+        job.status = BulkJob.DONE
+    except Exception as e:
+        job.status = BulkJob.FAILED
+        job.error = str(e)
+        raise
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
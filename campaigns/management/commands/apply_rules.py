@@ -0,0 +1,69 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from campaigns.models import Rule
+from campaigns.rules import apply_rules, check_rule
+from campaigns.tiktok_client import TikTokAPIError
+
+
+class Command(BaseCommand):
+    help = "Evaluate the enabled automation rules over every ad group and apply their changes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--advertiser', action='append',
+                            help="Only run rules of this advertiser id; repeat for several.")
+        parser.add_argument('--rule', type=int, action='append',
+                            help="Only run the rule with this id; repeat for several.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Show what would change without sending anything.")
+
+    def handle(self, *args, **options):
+        rules = Rule.objects.filter(enabled=True)
+        if options['advertiser']:
+            rules = rules.filter(advertiser_id__in=options['advertiser'])
+        if options['rule']:
+            rules = rules.filter(pk__in=options['rule'])
+
+        by_advertiser = {}
+        for rule in rules:
+            try:
+                check_rule(rule)
+            except ValueError as e:
+                # Skip it rather than let it stop every advertiser's run.
+                self.stderr.write(f"{rule}: skipped, invalid rule: {e}")
+                if not options['dry_run']:
+                    rule.last_run_at = timezone.now()
+                    rule.last_result = f"Skipped, invalid rule: {e}"[:255]
+                    rule.save(update_fields=['last_run_at', 'last_result'])
+                continue
+            by_advertiser.setdefault(rule.advertiser_id, []).append(rule)
+        if not by_advertiser:
+            self.stdout.write("No enabled rules to run.")
+            return
+
+        failed_advertisers = []
+        for advertiser_id, advertiser_rules in by_advertiser.items():
+            try:
+                outcomes = apply_rules(advertiser_id, advertiser_rules, dry_run=options['dry_run'])
+            except (requests.exceptions.RequestException, TikTokAPIError) as e:
+                # One unreachable account shouldn't stop the others' rules.
+                self.stderr.write(f"Loading ad groups for {advertiser_id} failed: {e}")
+                failed_advertisers.append(advertiser_id)
+                continue
+
+            for rule, matched, changes, result in outcomes:
+                if options['dry_run']:
+                    summary = f"{matched} matched, {len(changes)} would change"
+                else:
+                    succeeded, failed = (result.succeeded, result.failed) if result else ([], {})
+                    summary = f"{matched} matched, {len(succeeded)} changed, {len(failed)} failed"
+                    rule.last_run_at = timezone.now()
+                    rule.last_result = summary
+                    rule.save(update_fields=['last_run_at', 'last_result'])
+                    if failed:
+                        self.stderr.write(f"{rule}: {result.error_summary()}")
+                self.stdout.write(self.style.SUCCESS(f"{advertiser_id} {rule}: {summary}"))
+
+        if failed_advertisers:
+            raise CommandError(f"Rules didn't run for {', '.join(failed_advertisers)}.")
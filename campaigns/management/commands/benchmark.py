@@ -0,0 +1,106 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns.benchmark.runner import SCENARIOS, measure_cold_start, run_benchmark
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the UI views against a local fake TikTok API and save the results."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000],
+                            help="Ad groups in the fake account; one run per size (e.g. 1000 10000 100000).")
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                            help="View to benchmark; repeat for several. Defaults to all.")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--latency-ms', type=float, default=50.0,
+                            help="Delay the fake API adds to every call.")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of fake API calls answered with HTTP 503.")
+        parser.add_argument('--bulk-size', type=int, default=100,
+                            help="Ids selected in each bulk view request.")
+        parser.add_argument('--rate-limit', action='store_true',
+                            help="Keep the shared TikTok rate limiter on (needs REDIS_URL or TIKTOK_RATELIMIT_CACHE).")
+        parser.add_argument('--mirror', action='store_true',
+                            help="Sync the fake account into the local mirror before measuring.")
+        parser.add_argument('--cold-start', metavar='PATH', nargs='?', const='/',
+                            help="Also time cold starts of the WSGI app serving PATH (default /), "
+                                 "each in a fresh interpreter.")
+        parser.add_argument('--output', help="Results file (defaults to benchmarks/<time>-<revision>.json).")
+        parser.add_argument('--compare', help="Earlier results file to print p50/p95 changes against.")
+
+    def handle(self, *args, **options):
+        revision = git_revision()
+        parameters = {
+            key: options[key] for key in
+            ('sizes', 'scenario', 'iterations', 'latency_ms', 'error_rate', 'bulk_size', 'rate_limit', 'mirror',
+             'cold_start')
+        }
+        results = run_benchmark(
+            sizes=options['sizes'],
+            scenarios=options['scenario'],
+            iterations=options['iterations'],
+            latency=options['latency_ms'] / 1000,
+            error_rate=options['error_rate'],
+            bulk_size=options['bulk_size'],
+            rate_limit=options['rate_limit'],
+            use_mirror=options['mirror'],
+        )
+        if options['cold_start']:
+            results["cold start"] = measure_cold_start(options['iterations'], options['cold_start'])
+        report = {
+            "revision": revision,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "parameters": parameters,
+            "results": results,
+        }
+
+        output = Path(options['output'] or Path(settings.BASE_DIR, 'benchmarks',
+                      f"{datetime.now():%Y%m%d-%H%M%S}-{revision}.json"))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+        baseline = {}
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())["results"]
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        for size, scenarios in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(size if size == "cold start" else f"{size} ad groups"))
+            for name, stats in scenarios.items():
+                line = (f"  {name:<36} p50 {stats['p50_ms']:>9.1f} ms  p95 {stats['p95_ms']:>9.1f} ms"
+                        f"  calls {stats['upstream_calls']:>7.1f}")
+                if 'peak_memory_kb' in stats:
+                    line += f"  peak {stats['peak_memory_kb']:>9.1f} KiB"
+                if stats.get('db_connected'):
+                    line += "  (opened a database connection)"
+                before = baseline.get(size, {}).get(name)
+                if before:
+                    line += (f"  (p50 {self.change(before['p50_ms'], stats['p50_ms'])},"
+                             f" p95 {self.change(before['p95_ms'], stats['p95_ms'])})")
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def change(self, before, after):
+        if not before:
+            return "n/a"
+        return f"{(after - before) * 100 / before:+.0f}%"
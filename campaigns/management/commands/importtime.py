@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(stderr):
+    """
+    Return `[(module, self_us, cumulative_us)]` from `python -X importtime`
+    output, in import order.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the column header
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Break down where a cold start of the WSGI app spends its import time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/',
+                            help="URL the cold start serves after importing the app (default /).")
+        parser.add_argument('--limit', type=int, default=15, help="Rows shown per table.")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "tiktok.settings")}
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "campaigns.benchmark.coldstart", options['path']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"Cold start failed:\n{process.stderr[-2000:]}")
+        timings = json.loads(process.stdout.splitlines()[-1])
+        modules = parse_importtime(process.stderr)
+
+        packages = defaultdict(lambda: [0, 0])
+        for name, self_us, _ in modules:
+            package = packages[name.split(".")[0]]
+            package[0] += self_us
+            package[1] += 1
+        total_us = sum(self_us for _, self_us, _ in modules)
+
+        self.stdout.write(
+            f"Cold start of {options['path']}: HTTP {timings['status']}, import {timings['import_ms']:.1f} ms,"
+            f" first request {timings['first_request_ms']:.1f} ms, total {timings['total_ms']:.1f} ms"
+        )
+        self.stdout.write(
+            f"{len(modules)} modules imported in {total_us / 1000:.1f} ms;"
+            f" database connection {'opened' if timings['db_connected'] else 'not opened'}"
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("By package"))
+        ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+        for package, (self_us, count) in ranked[:options['limit']]:
+            self.stdout.write(f"  {package:<40} {self_us / 1000:>8.1f} ms  {self_us * 100 / total_us:>5.1f}%"
+                              f"  {count:>4} modules")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Slowest modules (own time)"))
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: module[1],
+                                                   reverse=True)[:options['limit']]:
+            self.stdout.write(f"  {name:<60} {self_us / 1000:>8.1f} ms  (with imports {cumulative_us / 1000:.1f} ms)")
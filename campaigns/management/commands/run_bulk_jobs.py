@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from campaigns.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued bulk budget, schedule and status jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help="Jobs to run at once; each one also fans out its own requests.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit as soon as the queue is empty.")
+        parser.add_argument('--requeue-running', action='store_true',
+                            help="Put jobs left running by a stopped worker back in the queue first.")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Seconds without a heartbeat before --requeue-running treats a job as abandoned.")
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued = requeue_stale_jobs(options['stale_after'])
+            self.stdout.write(f"Requeued {requeued} stale running job(s)")
+
+        workers = options['workers']
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Top the pool up whenever a slot is free, rather than waiting
+                # for the slowest job of a batch.
+                close_old_connections()
+                while len(running) < workers:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    running.add(pool.submit(self.run, job))
+                if not running:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+
+    def run(self, job):
+        """
+        Run one claimed job on a pool thread.
+        """
+        close_old_connections()
+        try:
+            run_job(job)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Job #{job.pk} failed: {e}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Job #{job.pk} finished"))
+        finally:
+            close_old_connections()
@@ -0,0 +1,79 @@
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns import mirror
+from campaigns.models import AdvertiserAccount
+from campaigns.streaming import iter_records
+from campaigns.tiktok_client import TikTokAPIError
+from campaigns.writes import record_delete
+
+UPSERT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mirror TikTok campaigns and ad groups into the local database. TikTok's list endpoints only filter by"
+        " creation time, so every run lists the whole account: rows changed since the last sync are upserted and"
+        " rows TikTok no longer returns are dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--advertiser', default=settings.TIKTOK_ADVERTISER_ID,
+                            help="Advertiser id to sync (defaults to TIKTOK_ADVERTISER_ID).")
+        parser.add_argument('--all-accounts', action='store_true',
+                            help="Sync every configured AdvertiserAccount instead of a single advertiser.")
+        parser.add_argument('--kind', choices=sorted(mirror.MIRRORS), action='append',
+                            help="Object type to sync; repeat for several. Defaults to all.")
+        parser.add_argument('--full', action='store_true',
+                            help="Ignore the stored watermark and upsert every row.")
+        parser.add_argument('--page-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['all_accounts']:
+            advertiser_ids = list(AdvertiserAccount.objects.values_list('advertiser_id', flat=True))
+            if not advertiser_ids:
+                raise CommandError("No advertiser accounts are configured.")
+        elif options['advertiser']:
+            advertiser_ids = [options['advertiser']]
+        else:
+            raise CommandError("No advertiser id given and TIKTOK_ADVERTISER_ID is not set.")
+
+        for advertiser_id in advertiser_ids:
+            for kind in options['kind'] or ["campaign", "adgroup"]:
+                try:
+                    written, seen, deleted = self.sync(kind, advertiser_id, options['page_size'], options['full'])
+                except (requests.exceptions.RequestException, TikTokAPIError) as e:
+                    raise CommandError(f"Syncing {kind}s for {advertiser_id} failed: {e}")
+                self.stdout.write(self.style.SUCCESS(
+                    f"{advertiser_id} {kind}: {written} of {seen} rows upserted, {deleted} deleted"
+                ))
+
+    def sync(self, kind, advertiser_id, page_size, full):
+        _, id_field, _ = mirror.MIRRORS[kind]
+        watermark = "" if full else mirror.get_watermark(kind, advertiser_id)
+        new_watermark = watermark
+        written = 0
+        seen_ids = set()
+        changed = []
+
+        for record in iter_records(kind, advertiser_id, page_size=page_size):
+            seen_ids.add(str(record.get(id_field)))
+            modify_time = record.get("modify_time") or ""
+            new_watermark = max(new_watermark, modify_time)
+            # ">=" re-upserts rows modified in the same second as the last sync.
+            if modify_time >= watermark:
+                changed.append(record)
+            if len(changed) >= UPSERT_BATCH_SIZE:
+                written += mirror.upsert(kind, advertiser_id, changed)
+                changed = []
+        written += mirror.upsert(kind, advertiser_id, changed)
+
+        # The listing above completed, so it saw every id: anything mirrored
+        # that it didn't return was deleted on TikTok.
+        model = mirror.MIRRORS[kind][0]
+        gone = set(model.objects.filter(advertiser_id=advertiser_id).values_list(id_field, flat=True)) - seen_ids
+        if gone:
+            record_delete(kind, advertiser_id, gone)
+        mirror.set_watermark(kind, advertiser_id, new_watermark)
+        return written, len(seen_ids), len(gone)
@@ -0,0 +1,185 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestStats:
+    """
+    Upstream calls and cache lookups made while serving one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.upstream = defaultdict(lambda: [0, 0.0])  # endpoint -> [calls, seconds]
+        self.bytes = 0
+        self.retries = 0
+        self.cache = defaultdict(int)  # (layer, "hit"/"miss") -> lookups
+
+    @property
+    def calls(self):
+        return sum(calls for calls, _ in self.upstream.values())
+
+    def server_timing(self):
+        """
+        Render the stats as a Server-Timing header value.
+        """
+        upstream_seconds = sum(seconds for _, seconds in self.upstream.values())
+        entries = [
+            f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}',
+            f'tiktok;dur={upstream_seconds * 1000:.1f};desc="{self.calls} calls, '
+            f'{self.retries} retries, {self.bytes} bytes"',
+        ]
+        for endpoint, (calls, seconds) in sorted(self.upstream.items()):
+            name = "tiktok-" + endpoint.strip("/").replace("/", "-")
+            entries.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        for layer in sorted({layer for layer, _ in self.cache}):
+            entries.append(f'{layer};desc="{self.cache[layer, "hit"]} hits, {self.cache[layer, "miss"]} misses"')
+        return ", ".join(entries)
+
+
+class Registry:
+    """
+    Process-wide counters and histograms, exported in Prometheus text format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self.help = {}
+
+    def inc(self, name, labels, value=1, help=""):
+        with self.lock:
+            self.help.setdefault(name, ("counter", help))
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value, help=""):
+        with self.lock:
+            self.help.setdefault(name, ("histogram", help))
+            buckets, total, count = self.histograms.get((name, labels)) or ([0] * len(LATENCY_BUCKETS), 0.0, 0)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            self.histograms[name, labels] = [buckets, total + value, count + 1]
+
+    def render(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: list(value) for key, value in self.histograms.items()}
+            help = dict(self.help)
+        lines = []
+        for name, (kind, text) in sorted(help.items()):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value:g}")
+                continue
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {bucket}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:g}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+registry = Registry()
+_current = contextvars.ContextVar("tiktok_request_stats", default=None)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def propagate(func):
+    """
+    Wrap `func` so that calls on pool threads count towards the request that
+    submitted them.
+    """
+    stats = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(stats)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+def endpoint_label(path):
+    return path.strip("/") + "/"
+
+
+def record_upstream(method, path, status, seconds, nbytes):
+    """
+    Count one HTTP attempt against the TikTok API.
+    """
+    endpoint = endpoint_label(path)
+    labels = (("endpoint", endpoint), ("method", method))
+    registry.inc("tiktok_upstream_requests_total", labels + (("status", str(status)),),
+                 help="TikTok API calls, including retries.")
+    registry.observe("tiktok_upstream_request_duration_seconds", labels, seconds,
+                     help="Latency of TikTok API calls.")
+    registry.inc("tiktok_upstream_response_bytes_total", labels, nbytes,
+                 help="Response bytes received from the TikTok API.")
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.upstream[endpoint][0] += 1
+            stats.upstream[endpoint][1] += seconds
+            stats.bytes += nbytes
+
+
+def record_retry(method, path):
+    registry.inc("tiktok_upstream_retries_total", (("endpoint", endpoint_label(path)), ("method", method)),
+                 help="TikTok API calls that were retried.")
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.retries += 1
+
+
+def record_cache(layer, hits, misses):
+    """
+    Count lookups served (`hits`) or not (`misses`) by a cache layer:
+    "index", "cache" or "mirror".
+    """
+    if not hits and not misses:
+        return
+    for result, count in (("hit", hits), ("miss", misses)):
+        if count:
+            registry.inc("tiktok_cache_lookups_total", (("layer", layer), ("result", result)), count,
+                         help="Record lookups per cache layer.")
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.cache[layer, "hit"] += hits
+            stats.cache[layer, "miss"] += misses
+
+
+def record_response(view, method, status, seconds):
+    labels = (("view", view), ("method", method))
+    registry.inc("http_requests_total", labels + (("status", str(status)),), help="Requests served.")
+    registry.observe("http_request_duration_seconds", labels, seconds, help="Time to serve a request.")
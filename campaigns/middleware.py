@@ -0,0 +1,45 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+
+class ServerTimingMiddleware:
+    """
+    Collects the TikTok calls and cache lookups made while serving a request,
+    reports them in a `Server-Timing` header and adds the request to the
+    /metrics totals.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        metrics.record_response(view, request.method, response.status_code, time.perf_counter() - stats.started)
+        response["Server-Timing"] = stats.server_timing()
+        return response
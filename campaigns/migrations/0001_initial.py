@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adgroup_id', models.CharField(max_length=32, unique=True)),
+                ('advertiser_id', models.CharField(max_length=32)),
+                ('campaign_id', models.CharField(db_index=True, max_length=32)),
+                ('adgroup_name', models.CharField(blank=True, max_length=512)),
+                ('budget', models.FloatField(default=0)),
+                ('schedule_start_time', models.CharField(blank=True, max_length=19)),
+                ('schedule_end_time', models.CharField(blank=True, max_length=19)),
+                ('operation_status', models.CharField(blank=True, max_length=32)),
+                ('secondary_status', models.CharField(blank=True, max_length=64)),
+                ('modify_time', models.CharField(blank=True, max_length=19)),
+            ],
+            options={
+                'ordering': ['adgroup_id'],
+                'indexes': [models.Index(fields=['advertiser_id', 'adgroup_id'], name='campaigns_a_adverti_87ab63_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Campaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campaign_id', models.CharField(max_length=32, unique=True)),
+                ('advertiser_id', models.CharField(max_length=32)),
+                ('campaign_name', models.CharField(blank=True, max_length=512)),
+                ('budget', models.FloatField(default=0)),
+                ('operation_status', models.CharField(blank=True, max_length=32)),
+                ('secondary_status', models.CharField(blank=True, max_length=64)),
+                ('modify_time', models.CharField(blank=True, max_length=19)),
+            ],
+            options={
+                'ordering': ['campaign_id'],
+                'indexes': [models.Index(fields=['advertiser_id', 'campaign_id'], name='campaigns_c_adverti_5b5af5_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('advertiser_id', models.CharField(max_length=32)),
+                ('object_type', models.CharField(max_length=16)),
+                ('watermark', models.CharField(blank=True, max_length=19)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('advertiser_id', 'object_type'), name='unique_sync_state')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0002_bulk_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvertiserAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('advertiser_id', models.CharField(max_length=32, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('users', models.ManyToManyField(blank=True, related_name='advertiser_accounts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0003_advertiser_accounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bulkjobitem',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=16),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0004_bulk_job_item_skipped'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('advertiser_id', models.CharField(max_length=32)),
+                ('enabled', models.BooleanField(default=True)),
+                ('conditions', models.JSONField(default=list)),
+                ('action', models.CharField(choices=[('set_budget', 'Set budget'), ('extend_end', 'Extend end time'), ('set_status', 'Set status')], max_length=16)),
+                ('value', models.CharField(max_length=32)),
+                ('priority', models.IntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_result', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'ordering': ['priority', 'pk'],
+            },
+        ),
+    ]
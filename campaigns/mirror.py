@@ -0,0 +1,144 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics
+from .models import AdGroup, Campaign, SyncState
+
+# Mirrored model and TikTok field names for each object type.
+MIRRORS = {
+    "campaign": (Campaign, "campaign_id", [
+        "campaign_id", "campaign_name", "budget", "operation_status",
+        "secondary_status", "modify_time",
+    ]),
+    "adgroup": (AdGroup, "adgroup_id", [
+        "adgroup_id", "campaign_id", "adgroup_name", "budget",
+        "schedule_start_time", "schedule_end_time", "operation_status",
+        "secondary_status", "modify_time",
+    ]),
+}
+
+
+def is_synced(kind, advertiser_id):
+    """
+    True once `sync_tiktok` has mirrored this object type for the advertiser.
+    Cached, as every page view asks.
+    """
+    cache = caches[settings.TIKTOK_CACHE_ALIAS]
+    synced = cache.get(_synced_key(kind, advertiser_id))
+    if synced is None:
+        synced = SyncState.objects.filter(advertiser_id=advertiser_id, object_type=kind).exists()
+        cache.set(_synced_key(kind, advertiser_id), synced, settings.TIKTOK_CACHE_TTL)
+    return synced
+
+
+def _synced_key(kind, advertiser_id):
+    return f"mirror:synced:{kind}:{advertiser_id}"
+
+
+@receiver(post_save, sender=SyncState)
+@receiver(post_delete, sender=SyncState)
+def _sync_state_changed(sender, instance, **kwargs):
+    caches[settings.TIKTOK_CACHE_ALIAS].delete(_synced_key(instance.object_type, instance.advertiser_id))
+
+
+def get_watermark(kind, advertiser_id):
+    state = SyncState.objects.filter(advertiser_id=advertiser_id, object_type=kind).first()
+    return state.watermark if state else ""
+
+
+def set_watermark(kind, advertiser_id, watermark):
+    SyncState.objects.update_or_create(
+        advertiser_id=advertiser_id, object_type=kind, defaults={"watermark": watermark}
+    )
+
+
+def _to_row(kind, advertiser_id, record):
+    model, id_field, fields = MIRRORS[kind]
+    values = {field: record.get(field) for field in fields}
+    for field in fields:
+        if values[field] is None:
+            values[field] = 0 if field == "budget" else ""
+    values[id_field] = str(values[id_field])
+    if "campaign_id" in values:
+        values["campaign_id"] = str(values["campaign_id"])
+    return model(advertiser_id=advertiser_id, **values)
+
+
+def upsert(kind, advertiser_id, records, batch_size=1000):
+    """
+    Insert or update mirrored rows from raw TikTok records.
+    """
+    model, id_field, fields = MIRRORS[kind]
+    rows = [_to_row(kind, advertiser_id, record) for record in records if record.get(id_field)]
+    if rows:
+        model.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=[id_field],
+            update_fields=["advertiser_id"] + [field for field in fields if field != id_field],
+        )
+    return len(rows)
+
+
+def list_page(kind, advertiser_id, page=1, page_size=100):
+    """
+    Return one page of mirrored records as TikTok-shaped dicts, together with
+    a `page_info` dict like the one TikTok returns.
+    """
+    model, id_field, fields = MIRRORS[kind]
+    try:
+        page = max(int(page), 1)
+    except (TypeError, ValueError):
+        page = 1
+    queryset = model.objects.filter(advertiser_id=advertiser_id).order_by(id_field)
+    records = list(queryset.values(*fields)[(page - 1) * page_size:page * page_size])
+    total_number = queryset.count()
+    page_info = {
+        "page": page,
+        "page_size": page_size,
+        "total_number": total_number,
+        "total_page": -(-total_number // page_size),
+    }
+    metrics.record_cache("mirror", 1, 0)
+    return records, page_info
+
+
+def get_many(kind, advertiser_id, item_ids):
+    """
+    Return `{id: record}` for the mirrored ones of `item_ids`, as TikTok-shaped dicts.
+    """
+    model, id_field, fields = MIRRORS[kind]
+    rows = model.objects.filter(advertiser_id=advertiser_id, **{f"{id_field}__in": list(item_ids)}).values(*fields)
+    found = {row[id_field]: row for row in rows}
+    metrics.record_cache("mirror", len(found), len(item_ids) - len(found))
+    return found
+
+
+def iter_records(kind, advertiser_id, chunk_size=2000):
+    """
+    Yield every mirrored record of an object type as a TikTok-shaped dict,
+    reading the table in chunks rather than all at once.
+    """
+    model, id_field, fields = MIRRORS[kind]
+    queryset = model.objects.filter(advertiser_id=advertiser_id).order_by(id_field)
+    metrics.record_cache("mirror", 1, 0)
+    yield from queryset.values(*fields).iterator(chunk_size=chunk_size)
+
+
+def patch(kind, advertiser_id, item_ids, **values):
+    """
+    Apply a successful write to the mirrored rows so pages don't show stale data.
+    """
+    model, id_field, _ = MIRRORS[kind]
+    values.setdefault("modify_time", datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+    model.objects.filter(advertiser_id=advertiser_id, **{f"{id_field}__in": list(item_ids)}).update(**values)
+
+
+def remove(kind, advertiser_id, item_ids):
+    model, id_field, _ = MIRRORS[kind]
+    model.objects.filter(advertiser_id=advertiser_id, **{f"{id_field}__in": list(item_ids)}).delete()
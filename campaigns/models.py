@@ -1,3 +1,180 @@
 from django.db import models
 
-# Create your models here.
+
+class Campaign(models.Model):
+    """
+    Local mirror of a TikTok campaign, kept current by `manage.py sync_tiktok`.
+    """
+    campaign_id = models.CharField(max_length=32, unique=True)
+    advertiser_id = models.CharField(max_length=32)
+    campaign_name = models.CharField(max_length=512, blank=True)
+    budget = models.FloatField(default=0)
+    operation_status = models.CharField(max_length=32, blank=True)
+    secondary_status = models.CharField(max_length=64, blank=True)
+    # TikTok timestamps are kept as "YYYY-MM-DD HH:MM:SS" strings, which sort correctly.
+    modify_time = models.CharField(max_length=19, blank=True)
+
+    class Meta:
+        ordering = ['campaign_id']
+        indexes = [models.Index(fields=['advertiser_id', 'campaign_id'])]
+
+    def __str__(self):
+        return self.campaign_name or self.campaign_id
+
+
+class AdGroup(models.Model):
+    """
+    Local mirror of a TikTok ad group, kept current by `manage.py sync_tiktok`.
+    """
+    adgroup_id = models.CharField(max_length=32, unique=True)
+    advertiser_id = models.CharField(max_length=32)
+    campaign_id = models.CharField(max_length=32, db_index=True)
+    adgroup_name = models.CharField(max_length=512, blank=True)
+    budget = models.FloatField(default=0)
+    schedule_start_time = models.CharField(max_length=19, blank=True)
+    schedule_end_time = models.CharField(max_length=19, blank=True)
+    operation_status = models.CharField(max_length=32, blank=True)
+    secondary_status = models.CharField(max_length=64, blank=True)
+    modify_time = models.CharField(max_length=19, blank=True)
+
+    class Meta:
+        ordering = ['adgroup_id']
+        indexes = [models.Index(fields=['advertiser_id', 'adgroup_id'])]
+
+    def __str__(self):
+        return self.adgroup_name or self.adgroup_id
+
+
+class SyncState(models.Model):
+    """
+    Highest `modify_time` mirrored so far for one advertiser and object type.
+    """
+    advertiser_id = models.CharField(max_length=32)
+    object_type = models.CharField(max_length=16)
+    watermark = models.CharField(max_length=19, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['advertiser_id', 'object_type'], name='unique_sync_state'),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type} sync for {self.advertiser_id}"
+
+
+class BulkJob(models.Model):
+    """
+    A bulk budget, schedule or status change, run by `manage.py run_bulk_jobs`.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    BUDGET = 'budget'
+    SCHEDULE_END = 'schedule_end'
+    STATUS = 'status'
+    ACTION_CHOICES = [(BUDGET, 'Budget'), (SCHEDULE_END, 'Schedule end'), (STATUS, 'Status')]
+
+    advertiser_id = models.CharField(max_length=32)
+    object_type = models.CharField(max_length=16)
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    # New budget, "YYYY-MM-DD HH:MM:SS" end time, or ENABLE/DISABLE/DELETE.
+    value = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker after every chunk, so a dead worker's jobs can be told apart.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} job #{self.pk} ({self.status})"
+
+
+class BulkJobItem(models.Model):
+    """
+    Outcome for one campaign or ad group of a BulkJob.
+    """
+    PENDING = 'pending'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    # Already had the target value, so nothing was sent.
+    SKIPPED = 'skipped'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed'), (SKIPPED, 'Skipped')]
+
+    job = models.ForeignKey(BulkJob, related_name='items', on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [models.Index(fields=['job', 'status'])]
+
+    def __str__(self):
+        return f"{self.object_id} ({self.status})"
+
+
+class AdvertiserAccount(models.Model):
+    """
+    A TikTok advertiser account and the users who may manage it. Sharing one
+    account between several users is how an organization is set up.
+    """
+    advertiser_id = models.CharField(max_length=32, unique=True)
+    name = models.CharField(max_length=255)
+    users = models.ManyToManyField('auth.User', related_name='advertiser_accounts', blank=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.advertiser_id})"
+
+
+class Rule(models.Model):
+    """
+    An automated ad group change: `manage.py apply_rules` applies the action
+    to every ad group of the advertiser that matches all the conditions.
+    """
+    SET_BUDGET = 'set_budget'
+    EXTEND_END = 'extend_end'
+    SET_STATUS = 'set_status'
+    ACTION_CHOICES = [(SET_BUDGET, 'Set budget'), (EXTEND_END, 'Extend end time'), (SET_STATUS, 'Set status')]
+
+    name = models.CharField(max_length=255)
+    advertiser_id = models.CharField(max_length=32)
+    enabled = models.BooleanField(default=True)
+    # [{"field": "budget", "op": "gt", "value": 500}, ...]; see campaigns.rules
+    # for the fields and operators.
+    conditions = models.JSONField(default=list)
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    # New budget, days to push the end time back by, or ENABLE/DISABLE.
+    value = models.CharField(max_length=32)
+    # Rules run in ascending priority; later rules see earlier rules' changes.
+    priority = models.IntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_result = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['priority', 'pk']
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        from .rules import check_rule
+
+        try:
+            check_rule(self)
+        except ValueError as e:
+            raise ValidationError(str(e))
@@ -0,0 +1,45 @@
+from django.core.paginator import Paginator
+
+# Page sizes offered in the UI; TikTok's list endpoints accept at most 1000.
+PAGE_SIZES = (20, 50, 100, 500, 1000)
+DEFAULT_PAGE_SIZE = 100
+
+
+class RemotePaginator(Paginator):
+    """
+    Paginator over a source that is paged upstream.
+
+    Only the items of the page being shown are held; the total comes from
+    TikTok's `page_info` (or a mirror count), so page numbers and the last
+    page are correct without loading every record.
+    """
+    page_sizes = PAGE_SIZES
+
+    def __init__(self, page_items, total_number, per_page):
+        super().__init__(page_items, per_page)
+        self.total_number = total_number
+
+    @property
+    def count(self):
+        return self.total_number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        return self._get_page(self.object_list, number, self)
+
+
+def parse_page_args(request):
+    """
+    Return the requested `(page, page_size)`, falling back to sane defaults.
+    """
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = DEFAULT_PAGE_SIZE
+    if page_size not in PAGE_SIZES:
+        page_size = DEFAULT_PAGE_SIZE
+    return page, page_size
@@ -0,0 +1,116 @@
+import re
+
+import numpy as np
+
+from .models import BulkJob
+
+_timestamp = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+
+def _budgets(records):
+    values = []
+    for record in records:
+        try:
+            values.append(float(record.get("budget")))
+        except (TypeError, ValueError):
+            values.append(np.nan)
+    return np.array(values, dtype=float)
+
+
+def parse_times(records, field):
+    """
+    `field` of every record as datetime64, NaT where it is missing.
+    """
+    values = [record.get(field) or "" for record in records]
+    return np.array([value if _timestamp.match(value) else "NaT" for value in values], dtype="datetime64[s]")
+
+
+class BulkPlan:
+    """
+    What a bulk change would actually do to the selected objects.
+
+    `changes` lists `{id, name, current, target}` for the objects that would
+    change, in the order they were selected; `unchanged` are ids that already
+    have the target value; `invalid` maps ids that can't be changed to the
+    reason; `duplicates` counts ids selected more than once.
+    """
+
+    def __init__(self, kind, action, target, changes, unchanged, invalid, duplicates):
+        self.kind = kind
+        self.action = action
+        self.target = target
+        self.changes = changes
+        self.unchanged = unchanged
+        self.invalid = invalid
+        self.duplicates = duplicates
+
+    @property
+    def change_ids(self):
+        return [change["id"] for change in self.changes]
+
+
+def build_plan(kind, action, value, object_ids, records):
+    """
+    Compare a budget or schedule end change against the current `records`
+    (`{id: record}`) of the selected objects, all rows at once.
+
+    Budgets within half a cent of the target and end times equal to it are
+    no-ops; negative budgets and end times not after the ad group's start
+    are invalid, as are ids with no record.
+    """
+    ids = list(dict.fromkeys(str(object_id) for object_id in object_ids))
+    duplicates = len(object_ids) - len(ids)
+    invalid = {object_id: "Not found" for object_id in ids if object_id not in records}
+    found = [object_id for object_id in ids if object_id in records]
+    rows = [records[object_id] for object_id in found]
+
+    if action == BulkJob.BUDGET:
+        target = float(value)
+        current = _budgets(rows)
+        shown = current.tolist()
+        noop = np.abs(current - target) < 0.005
+        bad = np.full(len(rows), target < 0)
+        reasons = np.full(len(rows), "Budget cannot be negative.", dtype=object)
+    elif action == BulkJob.SCHEDULE_END:
+        target = str(value)
+        end = np.datetime64(target.replace(" ", "T"), "s")
+        starts = parse_times(rows, "schedule_start_time")
+        current = parse_times(rows, "schedule_end_time")
+        shown = [row.get("schedule_end_time") for row in rows]
+        noop = current == end
+        # NaT compares False, so ad groups without a start time pass.
+        bad = starts >= end
+        reasons = np.array([f"End time must be after start time: {row.get('schedule_start_time')}" for row in rows],
+                           dtype=object)
+    else:
+        raise ValueError(f"Bulk action {action!r} can't be planned.")
+
+    name_field = f"{kind}_name"
+    changes, unchanged = [], []
+    for position in np.flatnonzero(bad).tolist():
+        invalid[found[position]] = reasons[position]
+    for position in np.flatnonzero(noop & ~bad).tolist():
+        unchanged.append(found[position])
+    for position in np.flatnonzero(~noop & ~bad).tolist():
+        changes.append({
+            "id": found[position],
+            "name": rows[position].get(name_field),
+            "current": shown[position],
+            "target": target,
+        })
+    return BulkPlan(kind, action, target, changes, unchanged, invalid, duplicates)
+
+
+def plan_bulk_change(kind, action, value, object_ids, advertiser_id, fresh=False):
+    """
+    Look up the selected objects in one batched fetch and plan the change.
+
+    The views plan against cached records to preview and queue the change;
+    the job passes `fresh` to re-plan against TikTok's current state before
+    anything is written, so nothing is skipped or sent based on a stale copy.
+    """
+    from .ui_views import fetch_by_ids, normalize_adgroup, normalize_campaign
+
+    normalize = normalize_campaign if kind == "campaign" else normalize_adgroup
+    records = fetch_by_ids(kind, advertiser_id, object_ids, normalize, fresh=fresh)
+    return build_plan(kind, action, value, object_ids, records)
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .apps import check_shared_cache
+
+
+class RateLimiter:
+    """
+    Per-advertiser, per-endpoint-class request budget shared through the
+    Django cache, so every worker pointed at the same cache draws from the
+    same budget.
+
+    Requests are counted in fixed one-second windows, each allowing the
+    current rate; a burst straddling two windows can reach twice the rate
+    for that moment. When TikTok reports a rate limit the rate is halved,
+    down to `min_rate`, and it returns to the configured maximum once
+    `cooldown` seconds pass without another rate-limit answer.
+    """
+
+    def __init__(self, cache_alias, rates, min_rate=1, cooldown=30):
+        self.cache_alias = cache_alias
+        self.rates = rates
+        self.min_rate = min_rate
+        self.cooldown = cooldown
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, advertiser_id, endpoint_class, suffix):
+        return f"tiktok:rl:{advertiser_id}:{endpoint_class}:{suffix}"
+
+    def current_rate(self, advertiser_id, endpoint_class):
+        rate = self.cache.get(self._key(advertiser_id, endpoint_class, "rate"))
+        return rate if rate is not None else self.rates[endpoint_class]
+
+    async def acurrent_rate(self, advertiser_id, endpoint_class):
+        rate = await self.cache.aget(self._key(advertiser_id, endpoint_class, "rate"))
+        return rate if rate is not None else self.rates[endpoint_class]
+
+    def _wait(self, now):
+        return 1 - (now % 1) + random.uniform(0, 0.05)
+
+    def _take(self, advertiser_id, endpoint_class):
+        """
+        Try to take a slot in the current one-second window. Returns 0 on
+        success, otherwise how long to wait for the next window.
+        """
+        while True:
+            now = time.time()
+            window = self._key(advertiser_id, endpoint_class, int(now))
+            self.cache.add(window, 0, 2)
+            try:
+                used = self.cache.incr(window)
+            except ValueError:
+                # The window expired between add() and incr(); count again.
+                continue
+            if used <= self.current_rate(advertiser_id, endpoint_class):
+                return 0
+            return self._wait(now)
+
+    async def _atake(self, advertiser_id, endpoint_class):
+        while True:
+            now = time.time()
+            window = self._key(advertiser_id, endpoint_class, int(now))
+            await self.cache.aadd(window, 0, 2)
+            try:
+                used = await self.cache.aincr(window)
+            except ValueError:
+                continue
+            if used <= await self.acurrent_rate(advertiser_id, endpoint_class):
+                return 0
+            return self._wait(now)
+
+    def acquire(self, advertiser_id, endpoint_class):
+        """
+        Block until a request may be sent.
+        """
+        while True:
+            wait = self._take(advertiser_id, endpoint_class)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, advertiser_id, endpoint_class):
+        while True:
+            wait = await self._atake(advertiser_id, endpoint_class)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, advertiser_id, endpoint_class):
+        """
+        Halve the rate after TikTok rejected a call for exceeding its limit.
+        """
+        rate = max(self.min_rate, self.current_rate(advertiser_id, endpoint_class) // 2)
+        self.cache.set(self._key(advertiser_id, endpoint_class, "rate"), rate, self.cooldown)
+
+
+def endpoint_class(method):
+    return "read" if method == "GET" else "write"
+
+
+_limiter = None
+
+
+def get_limiter():
+    """
+    Return the process-wide RateLimiter, or None when rate limiting is off.
+
+    Raises ImproperlyConfigured if the budget would not be shared between
+    workers: each would allow the full rate on its own.
+    """
+    global _limiter
+    if not settings.TIKTOK_RATELIMIT_ENABLED:
+        return None
+    if _limiter is None or _limiter.cache_alias != settings.TIKTOK_RATELIMIT_CACHE:
+        check_shared_cache("TIKTOK_RATELIMIT_CACHE", settings.TIKTOK_RATELIMIT_CACHE)
+        _limiter = RateLimiter(
+            cache_alias=settings.TIKTOK_RATELIMIT_CACHE,
+            rates={"read": settings.TIKTOK_READ_QPS, "write": settings.TIKTOK_WRITE_QPS},
+            cooldown=settings.TIKTOK_RATELIMIT_COOLDOWN,
+        )
+    return _limiter
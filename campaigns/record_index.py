@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+
+
+class RecordIndex:
+    """
+    Process-local, id-keyed index of recently loaded TikTok records.
+
+    Every page load feeds it, so a detail or update page opened right after a
+    listing can be served without another upstream request.
+    """
+
+    def __init__(self, ttl=30, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def store(self, kind, advertiser_id, id_field, records):
+        now = time.monotonic()
+        with self._lock:
+            for record in records:
+                key = (kind, advertiser_id, str(record.get(id_field)))
+                self._records[key] = (now, record)
+                self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def get_many(self, kind, advertiser_id, item_ids):
+        """
+        Return `{id: record}` for the ids that are indexed and still fresh.
+        """
+        cutoff = time.monotonic() - self.ttl
+        found = {}
+        with self._lock:
+            for item_id in item_ids:
+                entry = self._records.get((kind, advertiser_id, str(item_id)))
+                if entry and entry[0] >= cutoff:
+                    found[str(item_id)] = entry[1]
+        metrics.record_cache("index", len(found), len(item_ids) - len(found))
+        return found
+
+    def discard(self, kind, advertiser_id, item_ids):
+        with self._lock:
+            for item_id in item_ids:
+                self._records.pop((kind, advertiser_id, str(item_id)), None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+index = RecordIndex(ttl=settings.TIKTOK_RECORD_INDEX_TTL)
@@ -0,0 +1,249 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .streaming import iter_pages
+from .tiktok_client import get_client
+
+# Daily reports can span at most 30 days per request.
+MAX_DAYS_PER_REQUEST = 30
+REPORT_PAGE_SIZE = 1000
+
+# Stored columns, in the order of MetricCube.values' first axis.
+METRICS = ("spend", "impressions", "clicks", "conversions", "revenue")
+SPEND, IMPRESSIONS, CLICKS, CONVERSIONS, REVENUE = range(len(METRICS))
+
+# Integrated report metrics requested per ad group and day. Revenue isn't
+# reported directly, so it's derived as ROAS × spend.
+REPORT_METRICS = [
+    "spend", "impressions", "clicks", "conversion", "complete_payment_roas",
+    "adgroup_name", "campaign_id", "campaign_name",
+]
+
+LEVELS = ("adgroup", "campaign")
+SORT_KEYS = ("spend", "impressions", "clicks", "conversions", "revenue", "ctr", "cpc", "cpa", "roas")
+
+
+class MetricCube:
+    """
+    Daily ad group metrics for a date range, stored column-wise.
+
+    `values` is a float64 array shaped (len(METRICS), ad groups, days); row i
+    is ad group `adgroup_ids[i]`, which belongs to campaign
+    `campaign_ids[campaign_index[i]]`, and column j is `start + j days`.
+    """
+
+    def __init__(self, start, end, adgroup_ids, adgroup_names, campaign_ids, campaign_names,
+                 campaign_index, values):
+        self.start = start
+        self.end = end
+        self.adgroup_ids = adgroup_ids
+        self.adgroup_names = adgroup_names
+        self.campaign_ids = campaign_ids
+        self.campaign_names = campaign_names
+        self.campaign_index = campaign_index
+        self.values = values
+        self.built_at = time.monotonic()
+
+    def covers(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def days(self, start, end):
+        return slice((start - self.start).days, (end - self.start).days + 1)
+
+    def labels(self, level):
+        if level == "campaign":
+            return self.campaign_ids, self.campaign_names
+        return self.adgroup_ids, self.adgroup_names
+
+    def totals(self, start, end, level="adgroup"):
+        """
+        Sum every metric over [start, end] per ad group or, rolled up, per
+        campaign. Returns an array shaped (len(METRICS), rows).
+        """
+        totals = self.values[:, :, self.days(start, end)].sum(axis=2)
+        if level == "campaign":
+            totals = np.stack([
+                np.bincount(self.campaign_index, weights=row, minlength=len(self.campaign_ids))
+                for row in totals
+            ])
+        return totals
+
+
+def ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float), where=denominator > 0)
+
+
+def kpis(totals):
+    """
+    Add CTR, CPC, CPA and ROAS to summed metrics. Returns `{name: array}`.
+    """
+    columns = dict(zip(METRICS, totals))
+    columns["ctr"] = ratio(totals[CLICKS], totals[IMPRESSIONS]) * 100
+    columns["cpc"] = ratio(totals[SPEND], totals[CLICKS])
+    columns["cpa"] = ratio(totals[SPEND], totals[CONVERSIONS])
+    columns["roas"] = ratio(totals[REVENUE], totals[SPEND])
+    return columns
+
+
+def change(current, previous):
+    """
+    Percent change per row; NaN where the previous period was zero.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous != 0, (current - previous) * 100 / previous, np.nan)
+
+
+def date_chunks(start, end):
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=MAX_DAYS_PER_REQUEST - 1))
+        yield start, chunk_end
+        start = chunk_end + timedelta(days=1)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_cube(advertiser_id, start, end):
+    """
+    Stream the daily ad group report for [start, end] into a MetricCube.
+
+    Rows are read page by page, 30 days per report query, and land in flat
+    per-column lists; they are scattered into the cube in one vectorized
+    assignment at the end.
+    """
+    client = get_client()
+    adgroups, campaigns = {}, {}
+    adgroup_names, campaign_names, campaign_of = [], [], []
+    rows, days = [], []
+    columns = [[] for _ in METRICS]
+
+    for chunk_start, chunk_end in date_chunks(start, end):
+        query = {
+            "report_type": "BASIC",
+            "data_level": "AUCTION_ADGROUP",
+            "dimensions": ["adgroup_id", "stat_time_day"],
+            "metrics": REPORT_METRICS,
+            "start_date": chunk_start.isoformat(),
+            "end_date": chunk_end.isoformat(),
+        }
+        for row in iter_pages(lambda page: client.report_page(advertiser_id, query, page, REPORT_PAGE_SIZE)):
+            dimensions, metrics = row.get("dimensions", {}), row.get("metrics", {})
+            adgroup_id = str(dimensions.get("adgroup_id"))
+            if adgroup_id not in adgroups:
+                campaign_id = str(metrics.get("campaign_id"))
+                if campaign_id not in campaigns:
+                    campaigns[campaign_id] = len(campaigns)
+                    campaign_names.append(metrics.get("campaign_name") or campaign_id)
+                adgroups[adgroup_id] = len(adgroups)
+                adgroup_names.append(metrics.get("adgroup_name") or adgroup_id)
+                campaign_of.append(campaigns[campaign_id])
+            rows.append(adgroups[adgroup_id])
+            days.append(str(dimensions.get("stat_time_day", ""))[:10])
+            spend = _number(metrics.get("spend"))
+            columns[SPEND].append(spend)
+            columns[IMPRESSIONS].append(_number(metrics.get("impressions")))
+            columns[CLICKS].append(_number(metrics.get("clicks")))
+            columns[CONVERSIONS].append(_number(metrics.get("conversion")))
+            columns[REVENUE].append(_number(metrics.get("complete_payment_roas")) * spend)
+
+    values = np.zeros((len(METRICS), len(adgroups), (end - start).days + 1))
+    if rows:
+        day_index = (np.array(days, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+        values[:, np.array(rows), day_index] = np.array(columns)
+    return MetricCube(
+        start, end,
+        adgroup_ids=np.array(list(adgroups), dtype=object),
+        adgroup_names=np.array(adgroup_names, dtype=object),
+        campaign_ids=np.array(list(campaigns), dtype=object),
+        campaign_names=np.array(campaign_names, dtype=object),
+        campaign_index=np.array(campaign_of, dtype=np.int64),
+        values=values,
+    )
+
+
+_cubes = {}
+_cubes_lock = threading.Lock()
+# One lock per advertiser, so building one advertiser's cube doesn't hold
+# up readers of every other.
+_build_locks = {}
+
+
+def _fresh_cube(advertiser_id, start, end):
+    cube = _cubes.get(advertiser_id)
+    if (cube is not None and cube.covers(start, end)
+            and time.monotonic() - cube.built_at < settings.TIKTOK_REPORT_TTL):
+        return cube
+    return None
+
+
+def get_cube(advertiser_id, start, end, refresh=False):
+    """
+    Return a MetricCube covering [start, end], building one if needed.
+
+    Cubes are kept per advertiser for TIKTOK_REPORT_TTL seconds and always
+    span at least the last TIKTOK_REPORT_DAYS days up to `end`, so moving the
+    date range around inside that window doesn't go back to TikTok.
+    """
+    if not refresh:
+        cube = _fresh_cube(advertiser_id, start, end)
+        if cube is not None:
+            return cube
+    with _cubes_lock:
+        build_lock = _build_locks.setdefault(advertiser_id, threading.Lock())
+    with build_lock:
+        if not refresh:
+            # Another request may have built it while this one waited.
+            cube = _fresh_cube(advertiser_id, start, end)
+            if cube is not None:
+                return cube
+        cube = build_cube(advertiser_id, min(start, end - timedelta(days=settings.TIKTOK_REPORT_DAYS - 1)), end)
+        with _cubes_lock:
+            _cubes[advertiser_id] = cube
+        return cube
+
+
+def clear():
+    with _cubes_lock:
+        _cubes.clear()
+        _build_locks.clear()
+
+
+def report_table(cube, start, end, level="adgroup", compare=False, sort="spend", limit=None):
+    """
+    Summarize [start, end] per ad group or campaign, optionally against the
+    equally long period just before it (which the cube must cover too).
+
+    Returns `(rows, totals)`: one dict per row sorted by `sort` descending
+    (at most `limit`), and a dict of account totals. Changes are None where
+    the previous period was zero.
+    """
+    totals = cube.totals(start, end, level)
+    columns = kpis(totals)
+    account = kpis(totals.sum(axis=1, keepdims=True))
+    if compare:
+        length = end - start + timedelta(days=1)
+        previous_columns = kpis(cube.totals(start - length, end - length, level))
+        for key in ("spend", "conversions", "revenue", "cpa", "roas"):
+            columns[f"{key}_change"] = change(columns[key], previous_columns[key])
+
+    # Rows with no activity in the period are left out.
+    active = np.flatnonzero(totals[SPEND] + totals[IMPRESSIONS] > 0)
+    order = active[np.argsort(-columns[sort][active], kind="stable")][:limit]
+    ids, names = cube.labels(level)
+    # Pull out just the shown rows, one column at a time, as plain Python values.
+    table = {"id": ids[order].tolist(), "name": names[order].tolist()}
+    table.update((key, _values(values[order])) for key, values in columns.items())
+    rows = [dict(zip(table, row)) for row in zip(*table.values())]
+    return rows, {key: _values(values)[0] for key, values in account.items()}
+
+
+def _values(array):
+    return [None if value != value else value for value in array.tolist()]
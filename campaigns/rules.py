@@ -0,0 +1,210 @@
+from datetime import datetime
+
+import numpy as np
+
+from .bulk import dispatch, dispatch_status
+from .export import records as iter_account_records
+from .models import Rule
+from .planner import parse_times
+from .tiktok_client import get_client
+from .writes import record_write
+
+# Condition fields. `days_to_end` is the (fractional) number of days until
+# the ad group's end time, negative once it has passed and unset without one.
+NUMERIC_FIELDS = ("budget", "days_to_end")
+TEXT_FIELDS = ("operation_status", "campaign_id")
+OPERATORS = {
+    "lt": np.less, "lte": np.less_equal, "gt": np.greater, "gte": np.greater_equal,
+    "eq": np.equal, "ne": np.not_equal,
+}
+TEXT_OPERATORS = ("eq", "ne")
+STATUSES = ("ENABLE", "DISABLE")
+
+
+def check_rule(rule):
+    """
+    Raise ValueError if a rule's conditions or action can't be evaluated.
+    """
+    if not isinstance(rule.conditions, list) or not rule.conditions:
+        raise ValueError("A rule needs at least one condition.")
+    for condition in rule.conditions:
+        if not isinstance(condition, dict):
+            raise ValueError(f"Invalid condition: {condition!r}")
+        field, op, value = condition.get("field"), condition.get("op"), condition.get("value")
+        if field in NUMERIC_FIELDS:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator {op!r}; choose from {', '.join(OPERATORS)}.")
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} needs a number, not {value!r}.")
+        elif field in TEXT_FIELDS:
+            if op not in TEXT_OPERATORS:
+                raise ValueError(f"{field} only supports {' and '.join(TEXT_OPERATORS)}.")
+        else:
+            raise ValueError(f"Unknown field {field!r}; choose from {', '.join(NUMERIC_FIELDS + TEXT_FIELDS)}.")
+
+    if rule.action in (Rule.SET_BUDGET, Rule.EXTEND_END):
+        try:
+            value = float(rule.value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{rule.get_action_display()} needs a number, not {rule.value!r}.")
+        if rule.action == Rule.SET_BUDGET and value < 0:
+            raise ValueError("Budget cannot be negative.")
+        if rule.action == Rule.EXTEND_END and value <= 0:
+            raise ValueError("Days to extend by must be positive.")
+    elif rule.action == Rule.SET_STATUS:
+        if rule.value not in STATUSES:
+            raise ValueError(f"Status must be one of {', '.join(STATUSES)}.")
+    else:
+        raise ValueError(f"Unknown action {rule.action!r}.")
+
+
+class AdGroupFrame:
+    """
+    Every ad group of an account as NumPy columns, so a rule's conditions are
+    a few array comparisons however many ad groups there are.
+    """
+
+    def __init__(self, records, now):
+        self.records = list(records)
+        self.ids = [str(record.get("adgroup_id")) for record in self.records]
+        self.now = np.datetime64(now.replace(microsecond=0), "s")
+        budgets = []
+        for record in self.records:
+            try:
+                budgets.append(float(record.get("budget")))
+            except (TypeError, ValueError):
+                budgets.append(np.nan)
+        self.columns = {
+            "budget": np.array(budgets, dtype=float),
+            "operation_status": np.array([record.get("operation_status") or "" for record in self.records],
+                                         dtype=object),
+            "campaign_id": np.array([str(record.get("campaign_id") or "") for record in self.records],
+                                    dtype=object),
+        }
+        self.start = parse_times(self.records, "schedule_start_time")
+        self.end = parse_times(self.records, "schedule_end_time")
+
+    def column(self, field):
+        if field == "days_to_end":
+            return (self.end - self.now) / np.timedelta64(1, "D")
+        return self.columns[field]
+
+    def match(self, rule):
+        """
+        Row numbers of the ad groups matching every condition of `rule`.
+        """
+        mask = np.ones(len(self.records), dtype=bool)
+        for condition in rule.conditions:
+            field, value = condition["field"], condition["value"]
+            if field in NUMERIC_FIELDS:
+                value = float(value)
+            else:
+                value = str(value)
+            # NaN (no budget, no end time) compares False, so such rows never match.
+            with np.errstate(invalid="ignore"):
+                mask &= OPERATORS[condition["op"]](self.column(field), value).astype(bool)
+        return np.flatnonzero(mask)
+
+    def targets(self, rule, rows):
+        """
+        Return `{id: new value}` for the matched rows whose value would
+        actually change, leaving out changes TikTok would reject.
+        """
+        if rule.action == Rule.SET_BUDGET:
+            target = float(rule.value)
+            rows = rows[~(np.abs(self.columns["budget"][rows] - target) < 0.005)]
+            return {self.ids[row]: target for row in rows.tolist()}
+        if rule.action == Rule.SET_STATUS:
+            rows = rows[self.columns["operation_status"][rows] != rule.value]
+            return {self.ids[row]: rule.value for row in rows.tolist()}
+        # Push each end time back, from now if it has already passed so the
+        # result never lands in the past; ad groups without one have nothing
+        # to extend (NaT stays NaT).
+        new_end = np.maximum(self.end[rows], self.now) + np.timedelta64(int(float(rule.value) * 86400), "s")
+        keep = ~np.isnat(new_end) & ~(new_end <= self.start[rows])
+        return {
+            self.ids[row]: str(end)
+            for row, end in zip(rows[keep].tolist(), new_end[keep].tolist())
+        }
+
+    def update(self, rule, changed):
+        """
+        Apply successful changes to the columns, so later rules see them.
+        """
+        positions = {object_id: row for row, object_id in enumerate(self.ids)}
+        for object_id, value in changed.items():
+            row = positions[object_id]
+            if rule.action == Rule.SET_BUDGET:
+                self.columns["budget"][row] = value
+            elif rule.action == Rule.SET_STATUS:
+                self.columns["operation_status"][row] = value
+            else:
+                self.end[row] = np.datetime64(value.replace(" ", "T"), "s")
+
+
+def send(rule, advertiser_id, changes):
+    """
+    Send the changes of one rule concurrently (status changes in TikTok's
+    batched calls) and return the BulkResult.
+    """
+    if rule.action == Rule.SET_STATUS:
+        return dispatch_status("adgroup", list(changes), rule.value, advertiser_id)
+    client = get_client()
+    if rule.action == Rule.SET_BUDGET:
+        return dispatch(list(changes), lambda object_id: client.post("adgroup/update/", {
+            "advertiser_id": advertiser_id,
+            "adgroup_id": object_id,
+            "budget": changes[object_id],
+        }))
+    return dispatch(list(changes), lambda object_id: client.post("adgroup/update/", {
+        "advertiser_id": advertiser_id,
+        "adgroup_id": object_id,
+        "schedule_type": "SCHEDULE_START_END",
+        "schedule_end_time": changes[object_id],
+    }))
+
+
+def record_changes(rule, advertiser_id, changed):
+    if rule.action == Rule.SET_BUDGET:
+        record_write("adgroup", advertiser_id, list(changed), budget=float(rule.value))
+    elif rule.action == Rule.SET_STATUS:
+        record_write("adgroup", advertiser_id, list(changed), operation_status=rule.value)
+    else:
+        by_end = {}
+        for object_id, end in changed.items():
+            by_end.setdefault(end, []).append(object_id)
+        for end, object_ids in by_end.items():
+            record_write("adgroup", advertiser_id, object_ids, schedule_end_time=end)
+
+
+def apply_rules(advertiser_id, rules, dry_run=False, now=None):
+    """
+    Evaluate `rules` in order against every ad group of the account, loaded
+    in one streaming pass, and send the resulting changes.
+
+    Returns `[(rule, matched, changes, result)]`; `result` is None on a dry
+    run or when nothing needed changing. Rules that fail check_rule() are
+    skipped and left out. Raises TikTokAPIError or a requests exception if loading fails.
+    """
+    frame = AdGroupFrame(iter_account_records("adgroup", advertiser_id), now or datetime.now())
+    outcomes = []
+    for rule in rules:
+        # Rules saved through the ORM, a fixture or the shell never ran clean().
+        try:
+            check_rule(rule)
+        except ValueError as e:
+            print(f"❌ Skipping invalid rule {rule}: {e}")
+            continue
+        rows = frame.match(rule)
+        changes = frame.targets(rule, rows)
+        result = None
+        if not dry_run and changes:
+            result = send(rule, advertiser_id, changes)
+            changed = {object_id: changes[object_id] for object_id in result.succeeded}
+            record_changes(rule, advertiser_id, changed)
+            frame.update(rule, changed)
+        outcomes.append((rule, len(rows), changes, result))
+    return outcomes
+
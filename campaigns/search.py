@@ -0,0 +1,271 @@
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .export import records as iter_account_records
+
+# Record field -> index column, per object type. Campaigns have no schedule
+# and belong to no campaign, so they only get the first three.
+COLUMNS = {
+    "campaign": {"campaign_name": "name", "operation_status": "status", "budget": "budget"},
+    "adgroup": {
+        "adgroup_name": "name", "operation_status": "status", "budget": "budget",
+        "schedule_end_time": "schedule_end", "campaign_id": "campaign",
+    },
+}
+SORT_KEYS = ("name", "status", "budget", "schedule_end", "campaign")
+STATUSES = ("ENABLE", "DISABLE")
+
+_token = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _token.findall((text or "").lower())
+
+
+def _budget(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _text(field, value):
+    """
+    Column value of a string field. Names are lowercased so they sort without
+    regard to case; missing values become "" so they sort first.
+    """
+    value = "" if value in (None, "N/A") else str(value)
+    return value.lower() if field == "name" else value
+
+
+def _set(column, rows, value):
+    """
+    Assign `value` to `rows`, widening a fixed-width string column if needed.
+    """
+    if column.dtype.kind == "U" and len(value) > column.dtype.itemsize // 4:
+        column = column.astype(f"U{len(value)}")
+    column[rows] = value
+    return column
+
+
+class SearchIndex:
+    """
+    Precomputed filter and sort index over every campaign or ad group of one
+    advertiser.
+
+    Each indexed field is a NumPy column; name tokens map to the rows they
+    appear in, and each column's sort order is computed once and reused, so
+    a query is a handful of vectorized mask operations and binary searches
+    instead of a pass over the records.
+    """
+
+    def __init__(self, kind, records):
+        self.kind = kind
+        self.fields = COLUMNS[kind]
+        self.records = list(records)
+        id_field = f"{kind}_id"
+        self.rows = {str(record.get(id_field)): row for row, record in enumerate(self.records)}
+        self.alive = np.ones(len(self.records), dtype=bool)
+        self.columns = {}
+        for field, column in self.fields.items():
+            if column == "budget":
+                self.columns[column] = np.array([_budget(record.get(field)) for record in self.records], dtype=float)
+            else:
+                values = [_text(column, record.get(field)) for record in self.records]
+                self.columns[column] = np.array(values, dtype=str) if values else np.array([], dtype="U1")
+        self.tokens = defaultdict(set)
+        for row, name in enumerate(self.columns["name"].tolist()):
+            for token in tokenize(name):
+                self.tokens[token].add(row)
+        self._postings = None
+        self._orders = {}
+        self.lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def postings(self):
+        """
+        The name tokens in sorted order, plus the rows of every token laid
+        end to end: token i's rows are `rows[offsets[i]:offsets[i + 1]]`.
+
+        Tokens sharing a prefix are adjacent, so all rows matching a prefix
+        are one contiguous slice.
+        """
+        if self._postings is None:
+            vocabulary = sorted(token for token, rows in self.tokens.items() if rows)
+            counts = np.fromiter((len(self.tokens[token]) for token in vocabulary), dtype=np.int64,
+                                 count=len(vocabulary))
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            rows = np.fromiter((row for token in vocabulary for row in self.tokens[token]), dtype=np.int64,
+                               count=int(offsets[-1]))
+            self._postings = (vocabulary, offsets, rows)
+        return self._postings
+
+    def order(self, column):
+        """
+        Row numbers sorted by `column`, and the column's values in that order.
+        """
+        if column not in self._orders:
+            order = np.argsort(self.columns[column], kind="stable")
+            self._orders[column] = (order, self.columns[column][order])
+        return self._orders[column]
+
+    def _term_mask(self, term):
+        """
+        Rows whose name has a word starting with `term`.
+        """
+        vocabulary, offsets, rows = self.postings()
+        first = bisect_left(vocabulary, term)
+        last = bisect_right(vocabulary, term + "\uffff", lo=first)
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[rows[offsets[first]:offsets[last]]] = True
+        return mask
+
+    def _range_mask(self, column, low=None, high=None):
+        """
+        Rows whose `column` lies within [low, high], found by binary search
+        on the column's sorted values.
+        """
+        order, values = self.order(column)
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def search(self, text="", status=None, campaign_id=None, budget_min=None, budget_max=None,
+               end_after=None, end_before=None, sort="name", descending=False):
+        """
+        Return the row numbers of the records matching every given filter,
+        sorted by `sort`; records_at() turns them into records.
+
+        Every word of `text` must prefix a word of the name. Budget bounds
+        are inclusive; end bounds are "YYYY-MM-DD HH:MM:SS" strings, also
+        inclusive, and exclude rows without an end time.
+        """
+        if sort not in self.columns:
+            sort = "name"
+        with self.lock:
+            mask = self.alive.copy()
+            for term in tokenize(text):
+                mask &= self._term_mask(term)
+            if status:
+                mask &= self.columns["status"] == status
+            if campaign_id and "campaign" in self.columns:
+                mask &= self.columns["campaign"] == str(campaign_id)
+            if budget_min is not None or budget_max is not None:
+                mask &= self._range_mask("budget", budget_min, budget_max)
+            if (end_after or end_before) and "schedule_end" in self.columns:
+                # "0" sorts after "", so rows without an end time drop out.
+                mask &= self._range_mask("schedule_end", end_after or "0", end_before)
+            order, _ = self.order(sort)
+            if descending:
+                order = order[::-1]
+            return order[mask[order]]
+
+    def records_at(self, rows):
+        return [self.records[row] for row in rows.tolist()]
+
+    def patch(self, item_ids, values):
+        """
+        Apply a write to the indexed records, updating only the affected
+        columns, tokens and sort orders.
+        """
+        with self.lock:
+            rows = [self.rows[str(item_id)] for item_id in item_ids if str(item_id) in self.rows]
+            if not rows:
+                return
+            for row in rows:
+                self.records[row].update(values)
+            for field, value in values.items():
+                column = self.fields.get(field)
+                if column is None:
+                    continue
+                if column == "budget":
+                    self.columns[column][rows] = _budget(value)
+                else:
+                    value = _text(column, value)
+                    if column == "name":
+                        for row in rows:
+                            for token in tokenize(self.columns["name"][row]):
+                                self.tokens[token].discard(row)
+                            for token in tokenize(value):
+                                self.tokens[token].add(row)
+                        self._postings = None
+                    self.columns[column] = _set(self.columns[column], rows, value)
+                self._orders.pop(column, None)
+
+    def discard(self, item_ids):
+        with self.lock:
+            for item_id in item_ids:
+                row = self.rows.get(str(item_id))
+                if row is not None:
+                    self.alive[row] = False
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+# One lock per (kind, advertiser), so building one index doesn't hold up
+# searches of every other.
+_build_locks = {}
+
+
+def _fresh_index(key):
+    search_index = _indexes.get(key)
+    if search_index is not None and time.monotonic() - search_index.built_at < settings.TIKTOK_SEARCH_TTL:
+        return search_index
+    return None
+
+
+def get_index(kind, advertiser_id, refresh=False):
+    """
+    Return the SearchIndex of an advertiser's campaigns or ad groups,
+    building it from the mirror (or one streaming pass over TikTok) if needed.
+
+    Writes made through this process are patched in as they happen; the
+    index is rebuilt after TIKTOK_SEARCH_TTL seconds to pick up changes made
+    elsewhere.
+    """
+    key = (kind, advertiser_id)
+    if not refresh:
+        search_index = _fresh_index(key)
+        if search_index is not None:
+            return search_index
+    with _indexes_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        if not refresh:
+            # Another request may have built it while this one waited.
+            search_index = _fresh_index(key)
+            if search_index is not None:
+                return search_index
+        search_index = SearchIndex(kind, iter_account_records(kind, advertiser_id))
+        with _indexes_lock:
+            _indexes[key] = search_index
+        return search_index
+
+
+def patch(kind, advertiser_id, item_ids, **values):
+    search_index = _indexes.get((kind, advertiser_id))
+    if search_index is not None:
+        search_index.patch(item_ids, values)
+
+
+def discard(kind, advertiser_id, item_ids):
+    search_index = _indexes.get((kind, advertiser_id))
+    if search_index is not None:
+        search_index.discard(item_ids)
+
+
+def clear():
+    with _indexes_lock:
+        _indexes.clear()
+        _build_locks.clear()
@@ -0,0 +1,57 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .metrics import propagate
+from .tiktok_client import get_client
+
+
+def iter_records(kind, advertiser_id, page_size=1000, window=None, filtering=None):
+    """
+    Yield every campaign or ad group (`kind`) of an account, in page order.
+
+    Raises TikTokAPIError or a requests exception if any page fails.
+    """
+    client = get_client()
+    yield from iter_pages(
+        lambda page: client.list_page(kind, advertiser_id, page, page_size, filtering), window
+    )
+
+
+def iter_pages(fetch_page, window=None):
+    """
+    Yield the rows of every page of a paged TikTok endpoint, in page order.
+
+    `fetch_page(page)` returns `(rows, page_info)`. Page 1 is fetched first to
+    learn `total_page`; the remaining pages are fetched in parallel, at most
+    `window` at a time, so memory stays bounded by the window while
+    wall-clock time is about one round trip per window.
+    """
+    rows, page_info = fetch_page(1)
+    yield from rows
+    total_page = page_info.get("total_page", 1)
+    if total_page <= 1:
+        return
+
+    window = window or settings.TIKTOK_STREAM_WINDOW
+    pages = iter(range(2, total_page + 1))
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        pending = deque()
+
+        def submit_next():
+            page = next(pages, None)
+            if page is not None:
+                pending.append(pool.submit(propagate(fetch_page), page))
+
+        for _ in range(window):
+            submit_next()
+        try:
+            while pending:
+                rows, _ = pending.popleft().result()
+                submit_next()
+                yield from rows
+        finally:
+            # Stop fetching if the consumer goes away early.
+            for future in pending:
+                future.cancel()
@@ -1,3 +1,727 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+import requests
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import api_cache
+from .accounts import user_accounts
+from .apps import check_shared_cache
+from .auth import get_cached_user
+from .authentication import CachedTokenAuthentication
+from .benchmark.fake_api import FakeTikTokAPI
+from .benchmark.runner import cold_start
+from .bulk import dispatch_status, response_error
+from .export import buffered
+from .jobs import job_progress, requeue_stale_jobs, run_job, submit_job
+from .models import AdvertiserAccount, BulkJob, BulkJobItem, Campaign, Rule
+from .planner import build_plan
+from .ratelimit import RateLimiter
+from .record_index import index
+from .reporting import SPEND, MetricCube, build_cube, date_chunks, report_table
+from .rules import AdGroupFrame, apply_rules, check_rule
+from .search import SearchIndex
+from .streaming import iter_pages
+from .ui_views import fetch_campaigns_by_ids
+from .views import decode_page_token, encode_page_token
+
+ADVERTISER_ID = "42"
+
+
+def http_response(status, body=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode() if body is not None else b""
+    return response
+
+
+class FakeAPITestCase(TestCase):
+    """
+    Runs against a FakeTikTokAPI account of `adgroup_count` ad groups and
+    `campaign_count` campaigns, starting every test with empty caches.
+    """
+    adgroup_count = 50
+    campaign_count = None
+
+    def setUp(self):
+        self.api = FakeTikTokAPI(self.adgroup_count, self.campaign_count).start()
+        self.addCleanup(self.api.stop)
+        overrides = override_settings(TIKTOK_BASE_URL=self.api.base_url, TIKTOK_ADVERTISER_ID=ADVERTISER_ID,
+                                      TIKTOK_RATELIMIT_ENABLED=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for cache in caches.all():
+            cache.clear()
+        index.clear()
+
+
+class ResponseErrorTests(TestCase):
+    def test_success(self):
+        self.assertIsNone(response_error(http_response(200, '{"code": 0, "message": "OK"}')))
+        self.assertIsNone(response_error(http_response(204)))
+
+    def test_non_zero_code_is_an_error(self):
+        self.assertEqual(response_error(http_response(200, '{"code": 40002, "message": "Not found"}')), "Not found")
+
+    def test_http_errors(self):
+        self.assertEqual(response_error(http_response(503, "busy")), "HTTP 503")
+        self.assertEqual(response_error(http_response(200, "<html>")), "Invalid response")
+
+    def test_httpx_responses(self):
+        self.assertIsNone(response_error(httpx.Response(200, json={"code": 0})))
+        self.assertEqual(response_error(httpx.Response(200, json={"code": 40100, "message": "Too many"})), "Too many")
+
+
+class DispatchStatusTests(FakeAPITestCase):
+    campaign_count = 45
+
+    def test_batches_and_maps_outcomes_per_id(self):
+        ids = self.api.ids["campaign"] + ["999"]
+        result = dispatch_status("campaign", ids + ids[:5], "DISABLE", ADVERTISER_ID)
+
+        # 46 unique ids in batches of at most 20.
+        self.assertEqual(self.api.calls["campaign/update/status/"], 3)
+        self.assertEqual(result.succeeded, self.api.ids["campaign"])
+        self.assertEqual(result.failed, {"999": "Not updated"})
+        self.assertEqual({record["operation_status"] for record in self.api.store["campaign"].values()}, {"DISABLE"})
+
+
+class SyncTests(FakeAPITestCase):
+    campaign_count = 5
+
+    def sync(self):
+        call_command("sync_tiktok", advertiser=ADVERTISER_ID, kind=["campaign"], stdout=StringIO())
+
+    def mirrored(self):
+        return dict(Campaign.objects.filter(advertiser_id=ADVERTISER_ID).values_list("campaign_id", "budget"))
+
+    def test_upserts_changes_after_the_watermark_and_drops_deleted_ids(self):
+        self.sync()
+        self.assertEqual(self.mirrored(), {i: r["budget"] for i, r in self.api.store["campaign"].items()})
+
+        changed, untouched, deleted = self.api.ids["campaign"][:3]
+        before = self.mirrored()
+        self.api.store["campaign"][changed].update(budget=1.0, modify_time="2025-06-01 00:00:00")
+        # Same modify_time as before, so the incremental sync doesn't re-read it.
+        self.api.store["campaign"][untouched]["budget"] = 2.0
+        del self.api.store["campaign"][deleted]
+        self.sync()
+
+        mirrored = self.mirrored()
+        self.assertEqual(mirrored[changed], 1.0)
+        self.assertEqual(mirrored[untouched], before[untouched])
+        self.assertNotIn(deleted, mirrored)
+        self.assertEqual(len(mirrored), 4)
+
+    def test_id_lookups_read_the_synced_mirror(self):
+        self.sync()
+        self.api.reset_calls()
+        ids = self.api.ids["campaign"][:2]
+        records = fetch_campaigns_by_ids(ADVERTISER_ID, ids)
+        self.assertEqual(list(records), ids)
+        self.assertEqual(self.api.call_count(), 0)
+
+
+class APICacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_patch_updates_only_cached_records(self):
+        api_cache.set_records("campaign", ADVERTISER_ID, [{"campaign_id": "1", "budget": 10.0}])
+        api_cache.patch("campaign", ADVERTISER_ID, ["1", "2"], budget=20.0)
+        self.assertEqual(api_cache.get_records("campaign", ADVERTISER_ID, ["1", "2"]),
+                         {"1": {"campaign_id": "1", "budget": 20.0}})
+
+    def test_invalidate_drops_records_and_pages(self):
+        records = [{"campaign_id": "1"}, {"campaign_id": "2"}]
+        api_cache.set_page("campaign", ADVERTISER_ID, 1, 20, records, {"total_page": 1})
+        self.assertEqual(api_cache.get_page("campaign", ADVERTISER_ID, 1, 20), (records, {"total_page": 1}))
+
+        api_cache.invalidate("campaign", ADVERTISER_ID, ["1"])
+        self.assertIsNone(api_cache.get_page("campaign", ADVERTISER_ID, 1, 20))
+        self.assertEqual(list(api_cache.get_records("campaign", ADVERTISER_ID, ["1", "2"])), ["2"])
+
+
+class IterPagesTests(TestCase):
+    total_page = 10
+
+    def setUp(self):
+        self.fetched = []
+
+    def fetch_page(self, page):
+        self.fetched.append(page)
+        # Later pages answer first, so the output order is the iterator's doing.
+        time.sleep((self.total_page - page) * 0.005)
+        return [f"{page}-a", f"{page}-b"], {"total_page": self.total_page}
+
+    def test_keeps_page_order(self):
+        rows = list(iter_pages(self.fetch_page, window=4))
+        self.assertEqual(rows, [f"{page}-{row}" for page in range(1, self.total_page + 1) for row in "ab"])
+
+    def test_stops_fetching_when_the_consumer_stops(self):
+        rows = iter_pages(self.fetch_page, window=2)
+        self.assertEqual([next(rows) for _ in range(3)], ["1-a", "1-b", "2-a"])
+        rows.close()
+        # Page 1, the first window and the one page queued after page 2 came back.
+        self.assertLessEqual(max(self.fetched), 4)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class AsyncViewTests(FakeAPITestCase):
+    campaign_count = 3
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user("async-viewer")
+        AdvertiserAccount.objects.create(advertiser_id="77", name="Other").users.add(user)
+        self.client.force_login(user)
+        self.async_client.cookies = self.client.cookies
+        self.advertisers = []
+        list_page = self.api.list
+
+        def recording_list(kind, params):
+            self.advertisers.append(params.get("advertiser_id"))
+            return list_page(kind, params)
+        self.api.list = recording_list
+
+    async def test_detail_reads_the_current_advertiser(self):
+        campaign_id = self.api.ids["campaign"][0]
+        response = await self.async_client.get(f"/async/campaign/detail/{campaign_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self.advertisers), {"77"})
+
+    async def test_bulk_jobs_belong_to_the_current_advertiser(self):
+        response = await self.async_client.post("/async/campaigns/bulk_update/", {
+            "campaign_ids": self.api.ids["campaign"][:2], "new_budget": "25", "confirm": "1",
+        })
+        job = await BulkJob.objects.aget()
+        self.assertRedirects(response, f"/jobs/{job.pk}/", fetch_redirect_response=False)
+        self.assertEqual(job.advertiser_id, "77")
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.limiter = RateLimiter("default", {"read": 3, "write": 1}, cooldown=30)
+
+    @mock.patch("campaigns.ratelimit.time.time", return_value=1000.25)
+    def test_window_allows_the_rate(self, _):
+        waits = [self.limiter._take(ADVERTISER_ID, "read") for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        # Until the next one-second window, plus jitter.
+        self.assertTrue(0.75 <= waits[3] <= 0.8)
+
+    @mock.patch("campaigns.ratelimit.time.time", return_value=1000.25)
+    def test_async_take_shares_the_window(self, _):
+        self.assertEqual(self.limiter._take(ADVERTISER_ID, "write"), 0)
+        self.assertGreater(async_to_sync(self.limiter._atake)(ADVERTISER_ID, "write"), 0)
+
+    def test_penalize_halves_down_to_the_minimum(self):
+        self.limiter.penalize(ADVERTISER_ID, "read")
+        self.assertEqual(self.limiter.current_rate(ADVERTISER_ID, "read"), 1)
+        self.limiter.penalize(ADVERTISER_ID, "read")
+        self.assertEqual(self.limiter.current_rate(ADVERTISER_ID, "read"), 1)
+        self.assertEqual(self.limiter.current_rate("other", "read"), 3)
+
+    def test_requires_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache("TIKTOK_RATELIMIT_CACHE", "default")
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache("TIKTOK_RATELIMIT_CACHE", None)
+
+
+class JobTests(FakeAPITestCase):
+    def test_progress_after_run(self):
+        updated, unchanged = self.api.ids["adgroup"][:2]
+        budget = self.api.store["adgroup"][unchanged]["budget"]
+        job = submit_job("adgroup", BulkJob.BUDGET, budget, [updated, unchanged, "999", updated], ADVERTISER_ID)
+
+        progress = job_progress(job)
+        self.assertEqual((progress["status"], progress["total"], progress["pending"]), (BulkJob.PENDING, 3, 3))
+
+        run_job(job)
+        progress = job_progress(job)
+        self.assertEqual(progress["status"], BulkJob.DONE)
+        self.assertEqual((progress["succeeded"], progress["skipped"], progress["failed"]), (1, 1, 1))
+        self.assertEqual(job.items.get(object_id="999").error, "Not found")
+        self.assertEqual(self.api.store["adgroup"][updated]["budget"], budget)
+
+    def test_rejected_writes_fail_their_items(self):
+        gone = self.api.ids["adgroup"][0]
+        job = submit_job("adgroup", BulkJob.BUDGET, 1, [gone], ADVERTISER_ID)
+        # TikTok lists the ad group but answers the update with an error code.
+        self.api.update = lambda kind, payload: {"code": 40002, "message": "Not found"}
+        run_job(job)
+        item = job.items.get()
+        self.assertEqual((item.status, item.error), (BulkJobItem.FAILED, "Not found"))
+
+    def test_failed_lookups_are_not_reported_missing(self):
+        job = submit_job("adgroup", BulkJob.BUDGET, 1, self.api.ids["adgroup"][:2], ADVERTISER_ID)
+        self.api.list = lambda kind, params: {"code": 40001, "message": "Invalid token"}
+        run_job(job)
+        self.assertEqual(job.status, BulkJob.DONE)
+        for item in job.items.all():
+            self.assertEqual(item.status, BulkJobItem.FAILED)
+            self.assertTrue(item.error.startswith("Lookup failed: "), item.error)
+
+    def test_requeues_only_stale_running_jobs(self):
+        now = timezone.now()
+        live = BulkJob.objects.create(advertiser_id=ADVERTISER_ID, object_type="adgroup", action=BulkJob.STATUS,
+                                      value="ENABLE", status=BulkJob.RUNNING, started_at=now, heartbeat_at=now)
+        stale = BulkJob.objects.create(advertiser_id=ADVERTISER_ID, object_type="adgroup", action=BulkJob.STATUS,
+                                       value="ENABLE", status=BulkJob.RUNNING, started_at=now - timedelta(hours=1),
+                                       heartbeat_at=now - timedelta(minutes=30))
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        live.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual((live.status, stale.status), (BulkJob.RUNNING, BulkJob.PENDING))
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"], METRICS_TOKEN=None)
+class MetricsTests(FakeAPITestCase):
+    campaign_count = 3
+
+    def test_server_timing_counts_upstream_calls(self):
+        self.client.force_login(User.objects.create_user("viewer"))
+        response = self.client.get(f"/campaign/detail/{self.api.ids['campaign'][0]}/")
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertIn('desc="1 calls, 0 retries', timing)
+        self.assertIn('tiktok-campaign-get;', timing)
+
+    def test_metrics_are_only_served_to_staff_or_the_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+            self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        self.client.get(f"/campaign/detail/{self.api.ids['campaign'][0]}/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tiktok_upstream_requests_total{endpoint="campaign/get/",method="GET",status="200"}',
+                      response.content.decode())
+
+
+class ReportingTests(FakeAPITestCase):
+    adgroup_count = 10
+    campaign_count = 2
+
+    def test_build_cube_totals(self):
+        start, end = date(2026, 10, 1), date(2026, 10, 5)
+        cube = build_cube(ADVERTISER_ID, start, end)
+        self.assertEqual(cube.values.shape, (5, 10, 5))
+        # The fake account's report: row r is ad group r // 5 on day r % 5.
+        spend = sum(round((1000 + (r * 7919) % 9000) * 0.004, 2) for r in range(50))
+        self.assertAlmostEqual(cube.totals(start, end).sum(axis=1)[SPEND], spend, places=6)
+        campaigns = cube.totals(start, end, level="campaign")
+        self.assertEqual(campaigns.shape, (5, 2))
+        self.assertAlmostEqual(campaigns[SPEND].sum(), spend, places=6)
+
+    def test_report_queries_span_at_most_30_days(self):
+        chunks = list(date_chunks(date(2026, 1, 1), date(2026, 3, 1)))
+        self.assertEqual(chunks, [(date(2026, 1, 1), date(2026, 1, 30)), (date(2026, 1, 31), date(2026, 3, 1))])
+
+    def test_compare_against_the_previous_period(self):
+        values = np.zeros((5, 2, 4))
+        values[SPEND] = [[10, 10, 30, 30], [0, 0, 5, 5]]
+        cube = MetricCube(date(2026, 10, 1), date(2026, 10, 4), np.array(["1", "2"], dtype=object),
+                          np.array(["A", "B"], dtype=object), np.array(["9"], dtype=object),
+                          np.array(["C"], dtype=object), np.array([0, 0]), values)
+        rows, totals = report_table(cube, date(2026, 10, 3), date(2026, 10, 4), compare=True)
+        self.assertEqual([(row["id"], row["spend"], row["spend_change"]) for row in rows],
+                         [("1", 60.0, 200.0), ("2", 10.0, None)])
+        self.assertEqual(totals["spend"], 70.0)
+
+        rows, _ = report_table(cube, date(2026, 10, 3), date(2026, 10, 4), level="campaign")
+        self.assertEqual([(row["id"], row["spend"]) for row in rows], [("9", 70.0)])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class ExportTests(FakeAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user("exporter"))
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_the_selected_columns(self):
+        response = self.client.get("/adgroups/export/?columns=adgroup_id,budget&columns=adgroup_name")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(self.content(response).splitlines()))
+        self.assertEqual(rows[0], ["adgroup_id", "budget", "adgroup_name"])
+        self.assertEqual([row[0] for row in rows[1:]], self.api.ids["adgroup"])
+
+    def test_ndjson_has_one_object_per_record(self):
+        response = self.client.get("/campaigns/export/?format=ndjson&columns=campaign_id")
+        lines = self.content(response).splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{"campaign_id": campaign_id} for campaign_id in self.api.ids["campaign"]])
+
+    def test_rejects_unknown_columns_and_formats(self):
+        self.assertEqual(self.client.get("/adgroups/export/?columns=adgroup_id,password").status_code, 400)
+        self.assertEqual(self.client.get("/adgroups/export/?format=xlsx").status_code, 400)
+
+    def test_lines_are_joined_into_blocks(self):
+        self.assertEqual(list(buffered(["ab\n", "cd\n", "ef\n"], size=5)), ["ab\ncd\n", "ef\n"])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class AccountTests(FakeAPITestCase):
+    campaign_count = 3
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("manager")
+        for advertiser_id in ("71", "72"):
+            AdvertiserAccount.objects.create(advertiser_id=advertiser_id, name=advertiser_id).users.add(self.user)
+        AdvertiserAccount.objects.create(advertiser_id="99", name="Someone else's")
+        self.client.force_login(self.user)
+
+    def bulk_update(self):
+        return self.client.post("/campaigns/bulk_update/", {
+            "campaign_ids": self.api.ids["campaign"][:1], "new_budget": "25", "confirm": "1",
+        })
+
+    def test_switching_accounts_scopes_new_jobs(self):
+        self.client.post("/accounts/switch/", {"advertiser_id": "99"})
+        self.bulk_update()
+        self.client.post("/accounts/switch/", {"advertiser_id": "72"})
+        self.bulk_update()
+        self.assertEqual(list(BulkJob.objects.values_list("advertiser_id", flat=True)), ["72", "71"])
+
+    def test_other_advertisers_jobs_are_hidden(self):
+        job = submit_job("campaign", BulkJob.BUDGET, 25, self.api.ids["campaign"][:1], "99")
+        self.assertEqual(self.client.get(f"/jobs/{job.pk}/").status_code, 404)
+
+    def test_api_refuses_other_advertisers(self):
+        token = Token.objects.create(user=self.user)
+        response = self.client.get("/api/campaigns/?advertiser_id=99", HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(TIKTOK_ADVERTISER_ID=None)
+    def test_users_without_an_account_cannot_queue_jobs(self):
+        self.client.force_login(User.objects.create_user("newcomer"))
+        self.assertEqual(self.bulk_update().status_code, 404)
+        self.assertFalse(BulkJob.objects.exists())
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.index = SearchIndex("adgroup", [
+            {"adgroup_id": "1", "adgroup_name": "Summer Sale US", "operation_status": "ENABLE", "budget": 50,
+             "schedule_end_time": "2026-11-01 00:00:00", "campaign_id": "9"},
+            {"adgroup_id": "2", "adgroup_name": "summer retargeting", "operation_status": "DISABLE", "budget": 20,
+             "schedule_end_time": "", "campaign_id": "9"},
+            {"adgroup_id": "3", "adgroup_name": "Winter Sale", "operation_status": "ENABLE", "budget": "N/A",
+             "schedule_end_time": "2027-01-01 00:00:00", "campaign_id": "8"},
+        ])
+
+    def ids(self, **query):
+        return [record["adgroup_id"] for record in self.index.records_at(self.index.search(**query))]
+
+    def test_tokens_and_prefixes(self):
+        self.assertEqual(self.ids(text="sale"), ["1", "3"])
+        self.assertEqual(self.ids(text="sum"), ["2", "1"])
+        self.assertEqual(self.ids(text="SUMMER sa"), ["1"])
+        self.assertEqual(self.ids(text="autumn"), [])
+
+    def test_filters_and_ranges(self):
+        self.assertEqual(self.ids(status="ENABLE", campaign_id="9"), ["1"])
+        self.assertEqual(self.ids(budget_min=10, budget_max=50, sort="budget"), ["2", "1"])
+        self.assertEqual(self.ids(end_after="2026-12-01 00:00:00"), ["3"])
+        self.assertEqual(self.ids(end_before="2026-12-01 00:00:00"), ["1"])
+        self.assertEqual(self.ids(sort="budget", descending=True), ["1", "2", "3"])
+
+    def test_patch_and_discard(self):
+        self.index.patch(["3"], {"adgroup_name": "Summer Clearance", "budget": 100})
+        self.assertEqual(self.ids(text="summer", sort="budget"), ["2", "1", "3"])
+        self.assertEqual(self.ids(text="winter"), [])
+        self.index.discard(["2"])
+        self.assertEqual(self.ids(text="summer"), ["3", "1"])
+        self.assertEqual(len(self.index), 2)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class ConditionalListingTests(FakeAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user("viewer"))
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get("/campaigns/listing/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        response = self.client.get("/campaigns/listing/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get("/campaigns/listing/")["ETag"]
+        campaign_id = self.api.ids["campaign"][0]
+        self.client.post(f"/campaign/update/{campaign_id}/", {"budget": "777", "campaign_name": "Renamed"})
+
+        response = self.client.get("/campaigns/listing/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class FragmentCacheTests(FakeAPITestCase):
+    campaign_count = 3
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user("viewer"))
+        self.fragments = caches["fragments"]
+
+    def test_rows_are_rerendered_after_a_write(self):
+        self.client.get("/campaigns/listing/")
+        self.assertEqual(len(self.fragments._cache), 3)
+        self.client.get("/campaigns/listing/")
+        self.assertEqual(len(self.fragments._cache), 3)
+
+        campaign_id = self.api.ids["campaign"][0]
+        old_budget = self.api.store["campaign"][campaign_id]["budget"]
+        self.client.post(f"/campaign/update/{campaign_id}/", {"budget": "777"})
+        content = self.client.get("/campaigns/listing/").content.decode()
+        self.assertIn("<td>777.0</td>", content)
+        self.assertNotIn(f"<td>{old_budget}</td>", content)
+        self.assertEqual(len(self.fragments._cache), 4)
+
+
+class BuildPlanTests(TestCase):
+    records = {
+        "1": {"adgroup_id": "1", "adgroup_name": "A", "budget": 100.0,
+              "schedule_start_time": "2026-01-01 00:00:00", "schedule_end_time": "2026-06-01 00:00:00"},
+        "2": {"adgroup_id": "2", "adgroup_name": "B", "budget": 50.004,
+              "schedule_start_time": "2026-07-01 00:00:00", "schedule_end_time": "2026-08-01 00:00:00"},
+    }
+
+    def test_budget(self):
+        plan = build_plan("adgroup", BulkJob.BUDGET, "50", ["1", "2", "1", "3"], self.records)
+        self.assertEqual(plan.change_ids, ["1"])
+        self.assertEqual(plan.changes[0], {"id": "1", "name": "A", "current": 100.0, "target": 50.0})
+        self.assertEqual(plan.unchanged, ["2"])
+        self.assertEqual(plan.invalid, {"3": "Not found"})
+        self.assertEqual(plan.duplicates, 1)
+
+    def test_negative_budget_is_invalid(self):
+        plan = build_plan("adgroup", BulkJob.BUDGET, "-1", ["1", "2"], self.records)
+        self.assertEqual(plan.changes, [])
+        self.assertEqual(set(plan.invalid), {"1", "2"})
+
+    def test_schedule_end(self):
+        plan = build_plan("adgroup", BulkJob.SCHEDULE_END, "2026-06-01 00:00:00", ["1", "2"], self.records)
+        self.assertEqual(plan.unchanged, ["1"])
+        self.assertEqual(plan.invalid, {"2": "End time must be after start time: 2026-07-01 00:00:00"})
+        self.assertEqual(plan.changes, [])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class BulkPreviewTests(FakeAPITestCase):
+    adgroup_count = 3
+
+    def test_confirm_queues_the_previewed_ids_without_looking_them_up(self):
+        self.client.force_login(User.objects.create_user("planner"))
+        ids = self.api.ids["adgroup"][:2]
+        response = self.client.post("/adgroups/bulk_update/", {"adgroup_ids": ids, "new_budget": "30"})
+        self.assertContains(response, ids[0])
+        self.api.reset_calls()
+
+        self.client.post("/adgroups/bulk_update/", {"adgroup_ids": ids, "new_budget": "30", "confirm": "1"})
+        self.assertEqual(self.api.call_count(), 0)
+        self.assertEqual(sorted(BulkJob.objects.get().items.values_list("object_id", flat=True)), ids)
+
+
+class RuleTests(FakeAPITestCase):
+    adgroup_count = 4
+    now = datetime(2026, 10, 17, 12, 0)
+
+    def frame(self):
+        return AdGroupFrame([
+            {"adgroup_id": "1", "budget": 100, "operation_status": "ENABLE",
+             "schedule_start_time": "2020-01-01 00:00:00", "schedule_end_time": "2020-02-01 00:00:00"},
+            {"adgroup_id": "2", "budget": 10, "operation_status": "ENABLE",
+             "schedule_start_time": "2026-01-01 00:00:00", "schedule_end_time": "2026-10-20 00:00:00"},
+            {"adgroup_id": "3", "budget": None, "operation_status": "DISABLE"},
+        ], self.now)
+
+    def test_match(self):
+        frame = self.frame()
+        rule = Rule(conditions=[{"field": "budget", "op": "gte", "value": 10},
+                                {"field": "operation_status", "op": "eq", "value": "ENABLE"}])
+        self.assertEqual(frame.match(rule).tolist(), [0, 1])
+        rule = Rule(conditions=[{"field": "days_to_end", "op": "lt", "value": 7}])
+        self.assertEqual(frame.match(rule).tolist(), [0, 1])
+
+    def test_targets_skip_no_ops(self):
+        frame = self.frame()
+        rule = Rule(action=Rule.SET_BUDGET, value="10")
+        self.assertEqual(frame.targets(rule, np.arange(3)), {"1": 10.0, "3": 10.0})
+        rule = Rule(action=Rule.SET_STATUS, value="DISABLE")
+        self.assertEqual(frame.targets(rule, np.arange(3)), {"1": "DISABLE", "2": "DISABLE"})
+
+    def test_extend_end_never_lands_in_the_past(self):
+        rule = Rule(action=Rule.EXTEND_END, value="7")
+        self.assertEqual(self.frame().targets(rule, np.arange(3)),
+                         {"1": "2026-10-24 12:00:00", "2": "2026-10-27 00:00:00"})
+
+    def test_check_rule(self):
+        check_rule(Rule(conditions=[{"field": "budget", "op": "lt", "value": "5"}], action=Rule.SET_STATUS,
+                        value="DISABLE"))
+        for conditions, action, value in [
+            ([], Rule.SET_STATUS, "DISABLE"),
+            ([{"field": "operation_status", "op": "lt", "value": "ENABLE"}], Rule.SET_STATUS, "DISABLE"),
+            ([{"field": "budget", "op": "lt", "value": "5"}], Rule.EXTEND_END, "0"),
+        ]:
+            with self.assertRaises(ValueError):
+                check_rule(Rule(conditions=conditions, action=action, value=value))
+
+    def test_apply_rules_sends_and_chains_changes(self):
+        rules = [
+            Rule(name="floor", conditions=[{"field": "budget", "op": "lt", "value": 10000}],
+                 action=Rule.SET_BUDGET, value="5"),
+            Rule(name="pause", conditions=[{"field": "budget", "op": "lt", "value": 10}],
+                 action=Rule.SET_STATUS, value="DISABLE"),
+        ]
+        outcomes = apply_rules(ADVERTISER_ID, rules, now=self.now)
+        self.assertEqual([(matched, len(changes)) for _, matched, changes, _ in outcomes], [(4, 4), (4, 4)])
+        self.assertEqual({(record["budget"], record["operation_status"])
+                          for record in self.api.store["adgroup"].values()}, {(5.0, "DISABLE")})
+
+    def test_apply_rules_skips_invalid_rules(self):
+        invalid = Rule(name="everything", conditions=[], action=Rule.SET_STATUS, value="DISABLE")
+        valid = Rule(name="floor", conditions=[{"field": "budget", "op": "lt", "value": 10000}],
+                     action=Rule.SET_BUDGET, value="5")
+        output = StringIO()
+        with redirect_stdout(output):
+            outcomes = apply_rules(ADVERTISER_ID, [invalid, valid], now=self.now)
+        self.assertIn("Skipping invalid rule", output.getvalue())
+        self.assertEqual([rule.name for rule, _, _, _ in outcomes], ["floor"])
+        self.assertEqual({record["operation_status"] for record in self.api.store["adgroup"].values()}, {"ENABLE"})
+
+
+@mock.patch.dict(os.environ, {"LEAN_STARTUP": "true"})
+class LeanStartupTests(TestCase):
+    def test_rest_framework_app_is_left_out(self):
+        process = subprocess.run([sys.executable, "-c", (
+            "import django; django.setup(); from django.conf import settings; "
+            "print('rest_framework' in settings.INSTALLED_APPS, *settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'])"
+        )], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(process.stdout.split(), ["False", "campaigns.renderers.ORJSONRenderer"])
+
+    def test_pages_and_the_api_still_answer(self):
+        run = cold_start("/")
+        self.assertEqual((run["status"], run["db_connected"]), (200, False))
+        # Answered by the JSON-only renderer, without the rest_framework app.
+        self.assertEqual(cold_start("/api/campaigns/")["status"], 401)
+
+
+@override_settings(AUTH_CACHE_ALIAS="default", TIKTOK_ADVERTISER_ID=None)
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create_user("cached", first_name="Before")
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def test_user_is_reloaded_after_a_save(self):
+        get_cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk).first_name, "Before")
+
+        self.user.first_name = "After"
+        self.user.save()
+        self.assertEqual(get_cached_user(self.user.pk).first_name, "After")
+
+        self.user.delete()
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+    def test_token_is_cached_until_revoked(self):
+        key = self.token.key
+        self.authentication.authenticate_credentials(key)
+        with self.assertNumQueries(0):
+            user, _ = self.authentication.authenticate_credentials(key)
+        self.assertEqual(user, self.user)
+
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(key)
+
+    def test_token_of_a_deactivated_user_is_refused(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_accounts_are_reloaded_after_membership_changes(self):
+        def accounts():
+            request = RequestFactory().get("/")
+            request.user = self.user
+            return user_accounts(request)
+
+        self.assertEqual(accounts(), [])
+        AdvertiserAccount.objects.create(advertiser_id="71", name="Shop").users.add(self.user)
+        self.assertEqual(accounts(), [("71", "Shop")])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class APIPagingTests(FakeAPITestCase):
+    def setUp(self):
+        super().setUp()
+        token = Token.objects.create(user=User.objects.create_user("reader"))
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+
+    def test_page_token_round_trip(self):
+        self.assertEqual(decode_page_token(encode_page_token(3, 20)), (3, 20))
+
+    def test_walks_every_page(self):
+        data = self.client.get("/api/adgroups/?page_size=20&fields=adgroup_id").json()
+        self.assertIsNone(data["previous"])
+        seen = [row["adgroup_id"] for row in data["results"]]
+        first_page = list(seen)
+        while data["next"]:
+            data = self.client.get(data["next"]).json()
+            seen += [row["adgroup_id"] for row in data["results"]]
+        self.assertEqual(seen, self.api.ids["adgroup"])
+
+        second = self.client.get(self.client.get("/api/adgroups/?page_size=20").json()["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual([row["adgroup_id"] for row in back["results"]], first_page)
+
+    def test_selected_fields_only(self):
+        data = self.client.get("/api/campaigns/?fields=campaign_id,budget").json()
+        self.assertEqual({tuple(row) for row in data["results"]}, {("campaign_id", "budget")})
+        self.assertEqual(self.client.get("/api/campaigns/?fields=secret").status_code, 400)
+
+    def test_invalid_page_token(self):
+        self.assertEqual(self.client.get("/api/adgroups/?page_token=zzz").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/adgroups/?page_token={encode_page_token(1, 7)}").status_code, 404)
@@ -0,0 +1,211 @@
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import metrics
+from .ratelimit import endpoint_class, get_limiter
+
+# TikTok answers HTTP 200 with one of these codes when the call should be retried.
+RATE_LIMIT_CODES = {40100}
+RETRYABLE_API_CODES = RATE_LIMIT_CODES | {50000, 50002}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TikTokAPIError(Exception):
+    """
+    Raised when TikTok answers a read with a non-zero `code`.
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"TikTok API error {code}: {message}")
+        self.code = code
+
+
+class TikTokClient:
+    """
+    Thin wrapper around a pooled requests.Session for the TikTok Business API.
+
+    One instance is shared by the whole process so every upstream call reuses
+    keep-alive connections instead of doing a fresh TCP+TLS handshake.
+    """
+
+    def __init__(self, base_url, access_token, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_base=0.5, backoff_cap=8.0, pool_maxsize=20):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Access-Token": access_token or "",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None):
+        """
+        GET an endpoint. List and dict params are JSON-encoded as TikTok expects.
+        """
+        encoded = {
+            key: json.dumps(value) if isinstance(value, (list, dict)) else value
+            for key, value in (params or {}).items()
+        }
+        return self._request("GET", path, params=encoded)
+
+    def list_page(self, kind, advertiser_id, page=1, page_size=100, filtering=None):
+        """
+        Fetch one page of campaigns or ad groups (`kind`).
+
+        Returns `(items, page_info)`; raises TikTokAPIError on a non-zero code.
+        """
+        params = {"advertiser_id": advertiser_id, "page": page, "page_size": page_size}
+        if filtering:
+            params["filtering"] = filtering
+        return self.get_page(f"{kind}/get/", params)
+
+    def report_page(self, advertiser_id, query, page=1, page_size=1000):
+        """
+        Fetch one page of the integrated report for a `query` of report_type,
+        data_level, dimensions, metrics and dates.
+        """
+        return self.get_page("report/integrated/get/", {
+            "advertiser_id": advertiser_id, **query, "page": page, "page_size": page_size,
+        })
+
+    def get_page(self, path, params):
+        """
+        GET one page of a paged endpoint and return `(items, page_info)`;
+        raises TikTokAPIError on a non-zero code.
+        """
+        response = self.get(path, params)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("code") != 0:
+            raise TikTokAPIError(data.get("code"), data.get("message"))
+        body = data.get("data", {})
+        return body.get("list", []), body.get("page_info", {})
+
+    def post(self, path, payload):
+        """
+        POST a JSON payload to an endpoint.
+        """
+        return self._request("POST", path, json=payload)
+
+    def _request(self, method, path, **kwargs):
+        url = self.url(path)
+        limiter = get_limiter()
+        advertiser_id = request_advertiser(kwargs)
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire(advertiser_id, endpoint_class(method))
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                metrics.record_upstream(method, path, "error", time.perf_counter() - start, 0)
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                metrics.record_upstream(method, path, response.status_code, time.perf_counter() - start,
+                                        response_size(response))
+                if limiter and is_rate_limited(response):
+                    limiter.penalize(advertiser_id, endpoint_class(method))
+                if attempt >= self.max_retries or not self._should_retry(response):
+                    return response
+            metrics.record_retry(method, path)
+            self._sleep(attempt)
+            attempt += 1
+
+    def _should_retry(self, response):
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            return True
+        if response.status_code != 200:
+            return False
+        return api_code(response) in RETRYABLE_API_CODES
+
+    def _sleep(self, attempt):
+        # Full jitter: spreads retries from concurrent workers over the window.
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+
+
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    return response.status_code == 200 and api_code(response) in RATE_LIMIT_CODES
+
+
+def request_advertiser(kwargs):
+    """
+    Pick the advertiser id out of a request's query params or JSON payload.
+    """
+    return (kwargs.get("params") or kwargs.get("json") or {}).get("advertiser_id")
+
+
+def response_size(response):
+    """
+    Bytes received for a response: the compressed size when the server sent
+    Content-Length, otherwise the decoded body.
+    """
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return len(response.content)
+
+
+def api_code(response):
+    """
+    Return the TikTok `code` field of a response, or None if the body is not JSON.
+    """
+    try:
+        return response.json().get("code")
+    except ValueError:
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide TikTokClient, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TikTokClient(
+                    base_url=settings.TIKTOK_BASE_URL,
+                    access_token=settings.TIKTOK_ACCESS_TOKEN,
+                    connect_timeout=settings.TIKTOK_CONNECT_TIMEOUT,
+                    read_timeout=settings.TIKTOK_READ_TIMEOUT,
+                    max_retries=settings.TIKTOK_MAX_RETRIES,
+                    pool_maxsize=settings.TIKTOK_POOL_MAXSIZE,
+                )
+    return _client
+
+
+@receiver(setting_changed)
+def _reset_client(setting, **kwargs):
+    """
+    Rebuild the client after override_settings() changes its configuration.
+    """
+    global _client
+    if setting.startswith("TIKTOK_"):
+        _client = None
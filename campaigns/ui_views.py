@@ -1,78 +1,156 @@
-import os
 import requests
-from datetime import datetime
-from django.shortcuts import render, redirect
+import time
+from datetime import date, datetime, timedelta
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth import authenticate, login, logout as django_logout
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
 from urllib.parse import quote  # For URL encoding
 
 # Import TikTok API variables and functions
-from .views import BASE_URL, TIKTOK_ADVERTISER_ID, HEADERS
+from .accounts import SESSION_KEY, can_access, current_advertiser, require_advertiser
+from .tiktok_client import TikTokAPIError, get_client
+from . import api_cache, mirror
+from .bulk import chunked, dispatch_status, response_error, STATUS_OPERATIONS
+from .conditional import conditional_render
+from .export import FORMATS, columns_for, export_lines
+from .jobs import job_progress, submit_job
+from .models import BulkJob
+from .record_index import index
+from .writes import record_delete, record_write
+from .pagination import PAGE_SIZES, RemotePaginator, parse_page_args
+
+# Most ids TikTok accepts in one `filtering` id list.
+LOOKUP_BATCH_SIZE = 100
+# Rows shown on the report page; the rest of the sorted report is cut off.
+REPORT_ROW_LIMIT = 500
+
+def normalize_campaign(camp):
+    camp["campaign_name"] = camp.get("campaign_name") or "Unnamed Campaign"
+    camp["last_updated"] = camp.get("modify_time") or "Unknown"
+    return camp
+
+def normalize_adgroup(adgroup):
+    adgroup["adgroup_name"] = adgroup.get("adgroup_name") or "Unnamed Ad Group"
+    adgroup["budget"] = adgroup.get("budget") or 0
+    adgroup["schedule_start_time"] = adgroup.get("schedule_start_time") or "N/A"
+    adgroup["schedule_end_time"] = adgroup.get("schedule_end_time") or "N/A"
+    return adgroup
+
+def fetch_page(kind, advertiser_id, page=1, page_size=100):
+    """
+    Fetch one page of campaigns or ad groups with its `page_info`, from the
+    local mirror once it is synced.
+    """
+    normalize = normalize_campaign if kind == "campaign" else normalize_adgroup
+    if mirror.is_synced(kind, advertiser_id):
+        records, page_info = mirror.list_page(kind, advertiser_id, page, page_size)
+        records = [normalize(record) for record in records]
+    else:
+        cached = api_cache.get_page(kind, advertiser_id, page, page_size)
+        if cached is not None:
+            records, page_info = cached
+        else:
+            try:
+                records, page_info = get_client().list_page(kind, advertiser_id, page, page_size)
+            except (requests.exceptions.RequestException, TikTokAPIError) as e:
+                print(f"❌ Error fetching {kind}s: {e}")
+                return [], {}
+            records = [normalize(record) for record in records]
+            api_cache.set_page(kind, advertiser_id, page, page_size, records, page_info)
+    index.store(kind, advertiser_id, f"{kind}_id", records)
+    return records, page_info
+
+def fetch_campaigns(advertiser_id, page=1, page_size=100):
+    """
+    Fetch one page of campaigns.
+    """
+    return fetch_page("campaign", advertiser_id, page, page_size)[0]
 
-def fetch_campaigns(page=1, page_size=100):
+def fetch_by_ids(kind, advertiser_id, item_ids, normalize, fresh=False):
     """
-    Fetch campaigns from TikTok API with pagination support.
+    Return `{id: record}` for the given campaign or ad group ids.
+
+    Records come from the local mirror once it is synced, like listings, so
+    a list and a detail page show the same values; otherwise, and for ids
+    not mirrored yet, fresh records from the in-memory index or the shared
+    cache are used as-is, and the rest are requested with TikTok's id
+    filter, up to LOOKUP_BATCH_SIZE ids per call. With `fresh`, every id is requested
+    from TikTok, for decisions that must not act on a stale copy, and a
+    failed batch raises instead of leaving its ids out as if they didn't
+    exist.
     """
-    url = f"{BASE_URL}/campaign/get/?advertiser_id={TIKTOK_ADVERTISER_ID}&page={page}&page_size={page_size}"
-    try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("code") == 0:
-            campaigns = data.get("data", {}).get("list", [])
-            for camp in campaigns:
-                camp["campaign_name"] = camp.get("campaign_name", "Unnamed Campaign")
-                camp["last_updated"] = camp.get("modify_time", "Unknown")
-            return campaigns
-        return []
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching campaigns: {e}")
-        return []
-
-def fetch_campaign_details(campaign_id):
-    """
-    Return details for a single campaign from the list of all campaigns.
-    """
-    all_campaigns = fetch_campaigns()
-    for camp in all_campaigns:
-        if str(camp.get("campaign_id", "")) == str(campaign_id):
-            return camp
-    return None
-
-def fetch_adgroups(page=1, page_size=100):
-    """
-    Fetch ad groups from TikTok API with pagination support.
-    """
-    url = f"{BASE_URL}/adgroup/get/?advertiser_id={TIKTOK_ADVERTISER_ID}&page={page}&page_size={page_size}"
-    try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("code") == 0:
-            adgroups = data.get("data", {}).get("list", [])
-            for adgroup in adgroups:
-                adgroup["adgroup_name"] = adgroup.get("adgroup_name", "Unnamed Ad Group")
-                adgroup["budget"] = adgroup.get("budget", 0)
-                adgroup["schedule_start_time"] = adgroup.get("schedule_start_time", "N/A")
-                adgroup["schedule_end_time"] = adgroup.get("schedule_end_time", "N/A")
-            return adgroups
-        return []
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching ad groups: {e}")
-        return []
-
-def fetch_adgroup_details(adgroup_id):
-    """
-    Return details for a single ad group.
-    """
-    all_adgroups = fetch_adgroups()
-    for adgroup in all_adgroups:
-        if str(adgroup.get("adgroup_id", "")) == str(adgroup_id):
-            return adgroup
-    return None
+    id_field = f"{kind}_id"
+    item_ids = list(dict.fromkeys(str(item_id) for item_id in item_ids))
+    found = {}
+    missing = item_ids
+    if not fresh:
+        if mirror.is_synced(kind, advertiser_id):
+            found = {item_id: normalize(record)
+                     for item_id, record in mirror.get_many(kind, advertiser_id, item_ids).items()}
+            missing = [item_id for item_id in item_ids if item_id not in found]
+        found.update(index.get_many(kind, advertiser_id, missing))
+        missing = [item_id for item_id in missing if item_id not in found]
+        found.update(api_cache.get_records(kind, advertiser_id, missing))
+        missing = [item_id for item_id in missing if item_id not in found]
+    for batch in chunked(missing, LOOKUP_BATCH_SIZE):
+        try:
+            records, _ = get_client().list_page(
+                kind, advertiser_id, page_size=len(batch), filtering={f"{id_field}s": batch}
+            )
+        except (requests.exceptions.RequestException, TikTokAPIError) as e:
+            if fresh:
+                raise
+            print(f"❌ Error fetching {kind} details: {e}")
+            continue
+        records = [normalize(record) for record in records]
+        index.store(kind, advertiser_id, id_field, records)
+        api_cache.set_records(kind, advertiser_id, records)
+        found.update((str(record.get(id_field)), record) for record in records)
+    return found
+
+def fetch_campaigns_by_ids(advertiser_id, campaign_ids):
+    return fetch_by_ids("campaign", advertiser_id, campaign_ids, normalize_campaign)
+
+def fetch_campaign_details(advertiser_id, campaign_id):
+    """
+    Return details for a single campaign, looked up by id.
+    """
+    return fetch_campaigns_by_ids(advertiser_id, [campaign_id]).get(str(campaign_id))
+
+def fetch_adgroups(advertiser_id, page=1, page_size=100):
+    """
+    Fetch one page of ad groups.
+    """
+    return fetch_page("adgroup", advertiser_id, page, page_size)[0]
+
+def paginate(request, kind):
+    """
+    Fetch only the page the request asks for and wrap it in a paginator that
+    knows the upstream total.
+    """
+    advertiser_id = current_advertiser(request)
+    page_number, page_size = parse_page_args(request)
+    records, page_info = fetch_page(kind, advertiser_id, page_number, page_size)
+    paginator = RemotePaginator(records, page_info.get("total_number", len(records)), page_size)
+    if page_number > paginator.num_pages:
+        # Past the end: show the last page instead of an empty one.
+        page_number = paginator.num_pages
+        records, _ = fetch_page(kind, advertiser_id, page_number, page_size)
+        paginator.object_list = records
+    return paginator.get_page(page_number)
+
+def fetch_adgroups_by_ids(advertiser_id, adgroup_ids):
+    return fetch_by_ids("adgroup", advertiser_id, adgroup_ids, normalize_adgroup)
+
+def fetch_adgroup_details(advertiser_id, adgroup_id):
+    """
+    Return details for a single ad group, looked up by id.
+    """
+    return fetch_adgroups_by_ids(advertiser_id, [adgroup_id]).get(str(adgroup_id))
 
 def adgroup_detail(request, adgroup_id):
     """
@@ -80,8 +158,9 @@ def adgroup_detail(request, adgroup_id):
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
-    adgroup = fetch_adgroup_details(adgroup_id)
+    adgroup = fetch_adgroup_details(advertiser_id, adgroup_id)
     if not adgroup:
         return redirect('adgroup_listing')
 
@@ -93,16 +172,12 @@ def adgroup_delete(request, adgroup_id):
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
     if request.method == 'POST':
-        url = f"{BASE_URL}/v1.3/adgroup/update/status/"
-        payload = {
-            "advertiser_id": TIKTOK_ADVERTISER_ID,
-            "adgroup_id": adgroup_id,
-            "opt_type": "DELETE"
-        }
-        response = requests.post(url, json=payload, headers=HEADERS)
-        if response.status_code == 200:
+        result = dispatch_status("adgroup", [adgroup_id], "DELETE", advertiser_id)
+        if not result.failed:
+            record_delete("adgroup", advertiser_id, result.succeeded)
             return redirect('adgroup_listing')
         return render(request, 'adgroup_delete.html', {
             'adgroup_id': adgroup_id,
@@ -162,22 +237,19 @@ def dashboard(request):
     if not request.user.is_authenticated:
         return redirect('ui_login')
 
-    page_number = request.GET.get('page', 1)
-    adgroups = fetch_adgroups(page=page_number, page_size=100)
-    paginator = Paginator(adgroups, 100)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, "adgroup")
 
-    no_adgroups = (len(adgroups) == 0)
+    no_adgroups = (page_obj.paginator.count == 0)
     message = request.GET.get('message', None)  # Already present
     error = request.GET.get('error', None)
 
-    return render(request, 'dashboard.html', {
+    return conditional_render(request, 'dashboard.html', {
         'user': request.user,
         'page_obj': page_obj,
         'no_adgroups': no_adgroups,
         'message': message,
         'error': error
-    })
+    }, page_obj)
 
 def listing(request):
     """
@@ -186,12 +258,14 @@ def listing(request):
     if not request.user.is_authenticated:
         return redirect('ui_login')
 
-    page_number = request.GET.get('page', 1)
-    campaigns = fetch_campaigns(page=page_number, page_size=100)
-    paginator = Paginator(campaigns, 100)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, "campaign")
 
-    return render(request, 'listing.html', {'page_obj': page_obj})
+    return conditional_render(request, 'listing.html', {
+        'page_obj': page_obj,
+        'export_columns': mirror.MIRRORS["campaign"][2],
+        'message': request.GET.get('message', None),
+        'error': request.GET.get('error', None)
+    }, page_obj)
 
 def campaign_detail(request, campaign_id):
     """
@@ -199,8 +273,9 @@ def campaign_detail(request, campaign_id):
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
-    campaign = fetch_campaign_details(campaign_id)
+    campaign = fetch_campaign_details(advertiser_id, campaign_id)
     if not campaign:
         return redirect('dashboard')
 
@@ -212,8 +287,9 @@ def campaign_update(request, campaign_id):
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
-    campaign = fetch_campaign_details(campaign_id)
+    campaign = fetch_campaign_details(advertiser_id, campaign_id)
     if not campaign:
         return redirect('dashboard')
 
@@ -225,19 +301,21 @@ def campaign_update(request, campaign_id):
                 'error': "Please provide a new budget."
             })
 
-        url = f"{BASE_URL}/campaign/update/"
         payload = {
-            "advertiser_id": TIKTOK_ADVERTISER_ID,
+            "advertiser_id": advertiser_id,
             "campaign_id": campaign_id,
             "budget": float(budget)
         }
-        response = requests.post(url, json=payload, headers=HEADERS)
+        response = get_client().post("campaign/update/", payload)
 
-        if response.status_code == 200:
+        # TikTok rejects writes with HTTP 200 and a non-zero `code`.
+        error = response_error(response)
+        if error is None:
+            record_write("campaign", advertiser_id, [campaign_id], budget=float(budget))
             return redirect('campaign_listing')
         return render(request, 'campaign_update.html', {
             'campaign': campaign,
-            'error': "Failed to update campaign."
+            'error': f"Failed to update campaign: {error}"
         })
 
     return render(request, 'campaign_update.html', {'campaign': campaign})
@@ -248,16 +326,12 @@ def campaign_delete(request, campaign_id):
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
     if request.method == 'POST':
-        url = f"{BASE_URL}/campaign/update/status/"
-        payload = {
-            "advertiser_id": TIKTOK_ADVERTISER_ID,
-            "campaign_id": campaign_id,
-            "opt_type": "DELETE"
-        }
-        response = requests.post(url, json=payload, headers=HEADERS)
-        if response.status_code == 200:
+        result = dispatch_status("campaign", [campaign_id], "DELETE", advertiser_id)
+        if not result.failed:
+            record_delete("campaign", advertiser_id, result.succeeded)
             return redirect('dashboard')
         return render(request, 'campaign_delete.html', {
             'campaign_id': campaign_id,
@@ -266,54 +340,58 @@ def campaign_delete(request, campaign_id):
 
     return render(request, 'campaign_delete.html', {'campaign_id': campaign_id})
 
+def render_plan(request, plan, ids_field, value_field, back_url):
+    """
+    Shows a bulk change's dry run; confirming posts the real deltas back to
+    the same view with `confirm=1`.
+    """
+    return render(request, 'bulk_plan.html', {
+        'plan': plan,
+        'ids_field': ids_field,
+        'value_field': value_field,
+        'value': request.POST.get(value_field),
+        'back_url': reverse(back_url),
+    })
+
 def bulk_update(request):
     """
     Handles bulk updates of campaign budgets.
     """
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
 
     if request.method == 'POST':
         selected_campaigns = request.POST.getlist('campaign_ids')
         new_budget = request.POST.get('new_budget')
 
         if not new_budget:
-            campaigns = fetch_campaigns()
-            paginator = Paginator(campaigns, 100)
-            page_number = request.GET.get('page')
-            page_obj = paginator.get_page(page_number)
+            page_obj = paginate(request, "campaign")
             return render(request, 'bulk_update.html', {
                 'page_obj': page_obj,
                 'error': "Please provide a new budget."
             })
 
-        update_errors = []
-        for camp_id in selected_campaigns:
-            url = f"{BASE_URL}/campaign/update/"
-            payload = {
-                "advertiser_id": TIKTOK_ADVERTISER_ID,
-                "campaign_id": camp_id,
-                "budget": float(new_budget)
-            }
-            response = requests.post(url, json=payload, headers=HEADERS)
-            if response.status_code not in [200, 204]:
-                update_errors.append(camp_id)
-
-        if not update_errors:
-            return redirect('dashboard')
-        campaigns = fetch_campaigns()
-        paginator = Paginator(campaigns, 100)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        return render(request, 'bulk_update.html', {
-            'page_obj': page_obj,
-            'error': f"Failed to update campaigns: {', '.join(update_errors)}"
-        })
+        try:
+            new_budget = float(new_budget)
+        except ValueError as e:
+            page_obj = paginate(request, "campaign")
+            return render(request, 'bulk_update.html', {
+                'page_obj': page_obj,
+                'error': f"Invalid budget value: {str(e)}"
+            })
 
-    campaigns = fetch_campaigns()
-    paginator = Paginator(campaigns, 100)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        if request.POST.get('confirm') == "1" and selected_campaigns:
+            # The preview posted back only the ids it would change; the job
+            # re-plans them against TikTok before writing.
+            job = submit_job("campaign", BulkJob.BUDGET, new_budget, selected_campaigns,
+                             advertiser_id, request.user)
+            return redirect('job_detail', job_id=job.pk)
+        from .planner import plan_bulk_change  # pulls in numpy
+        plan = plan_bulk_change("campaign", BulkJob.BUDGET, new_budget, selected_campaigns, advertiser_id)
+        return render_plan(request, plan, 'campaign_ids', 'new_budget', 'campaign_bulk_update')
+
+    page_obj = paginate(request, "campaign")
     return render(request, 'bulk_update.html', {'page_obj': page_obj})
 
 def adgroup_listing(request):
@@ -323,34 +401,59 @@ def adgroup_listing(request):
     if not request.user.is_authenticated:
         return redirect('ui_login')
 
-    page_number = request.GET.get('page', 1)
-    adgroups = fetch_adgroups(page=page_number, page_size=100)
-    if not adgroups:
+    page_obj = paginate(request, "adgroup")
+    if not page_obj.object_list:
         print("No ad groups returned from fetch_adgroups")
-    paginator = Paginator(adgroups, 100)
-    page_obj = paginator.get_page(page_number)
 
-    return render(request, 'adgroup_listing.html', {
+    return conditional_render(request, 'adgroup_listing.html', {
         'page_obj': page_obj,
-        'no_adgroups': len(adgroups) == 0
-    })
+        'no_adgroups': page_obj.paginator.count == 0,
+        'export_columns': mirror.MIRRORS["adgroup"][2],
+        'message': request.GET.get('message', None),
+        'error': request.GET.get('error', None)
+    }, page_obj)
+
+def bulk_status(request, kind, ids_field, listing_url):
+    """
+    Applies a pause/enable/delete action to the selected campaigns or ad groups
+    using TikTok's batched status endpoint.
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
+    if request.method != 'POST':
+        return redirect(listing_url)
+
+    selected_ids = request.POST.getlist(ids_field)
+    opt_type = request.POST.get('opt_type')
+    if opt_type not in STATUS_OPERATIONS:
+        return redirect(f"{reverse(listing_url)}?error={quote('Unknown status action.')}")
+    if not selected_ids:
+        return redirect(f"{reverse(listing_url)}?error={quote('No items selected.')}")
+
+    job = submit_job(kind, BulkJob.STATUS, opt_type, selected_ids, advertiser_id, request.user)
+    return redirect('job_detail', job_id=job.pk)
+
+def campaign_bulk_status(request):
+    return bulk_status(request, "campaign", "campaign_ids", 'campaign_listing')
+
+def adgroup_bulk_status(request):
+    return bulk_status(request, "adgroup", "adgroup_ids", 'adgroup_listing')
 
 def adgroup_bulk_update(request):
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
 
     if request.method == 'POST':
         selected_adgroups = request.POST.getlist('adgroup_ids')
         new_budget = request.POST.get('new_budget')
 
         if not new_budget:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
+            page_obj = paginate(request, "adgroup")
             return render(request, 'adgroup_bulk_update.html', {
                 'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
+                'no_adgroups': page_obj.paginator.count == 0,
                 'error': "Please provide a new budget."
             })
 
@@ -359,56 +462,27 @@ def adgroup_bulk_update(request):
             if new_budget < 0:
                 raise ValueError("Budget cannot be negative.")
         except ValueError as e:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
+            page_obj = paginate(request, "adgroup")
             return render(request, 'adgroup_bulk_update.html', {
                 'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
+                'no_adgroups': page_obj.paginator.count == 0,
                 'error': f"Invalid budget value: {str(e)}"
             })
 
-        update_errors = []
-        updated_adgroups = []
-        for adgroup_id in selected_adgroups:
-            url = f"{BASE_URL}/adgroup/update/"
-            payload = {
-                "advertiser_id": TIKTOK_ADVERTISER_ID,
-                "adgroup_id": adgroup_id,
-                "budget": new_budget,
-            }
-            try:
-                response = requests.post(url, json=payload, headers=HEADERS)
-                if response.status_code in [200, 204]:
-                    updated_adgroups.append(adgroup_id)
-                else:
-                    update_errors.append(adgroup_id)
-            except requests.exceptions.RequestException as e:
-                update_errors.append(f"{adgroup_id} (Request failed: {str(e)})")
-
-        if not update_errors and updated_adgroups:
-            success_message = f"Ad Groups {', '.join(updated_adgroups)} updated with new Budget: ${new_budget:.2f}"
-            return redirect(f"/dashboard/?message={quote(success_message)}")
-        elif update_errors:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
-            return render(request, 'adgroup_bulk_update.html', {
-                'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
-                'error': f"Failed to update ad groups: {', '.join(update_errors)}"
-            })
+        if selected_adgroups:
+            if request.POST.get('confirm') == "1":
+                job = submit_job("adgroup", BulkJob.BUDGET, new_budget, selected_adgroups,
+                                 advertiser_id, request.user)
+                return redirect('job_detail', job_id=job.pk)
+            from .planner import plan_bulk_change  # pulls in numpy
+            plan = plan_bulk_change("adgroup", BulkJob.BUDGET, new_budget, selected_adgroups, advertiser_id)
+            return render_plan(request, plan, 'adgroup_ids', 'new_budget', 'adgroup_bulk_update')
 
     # On GET, render the bulk update page with the ad group list
-    page_number = request.GET.get('page', 1)
-    adgroups = fetch_adgroups(page=page_number, page_size=100)
-    paginator = Paginator(adgroups, 100)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, "adgroup")
     return render(request, 'adgroup_bulk_update.html', {
         'page_obj': page_obj,
-        'no_adgroups': len(adgroups) == 0
+        'no_adgroups': page_obj.paginator.count == 0
     })
 
 from urllib.parse import quote  # Ensure this is imported at the top
@@ -416,8 +490,9 @@ from urllib.parse import quote  # Ensure this is imported at the top
 def adgroup_update(request, adgroup_id):
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
 
-    adgroup = fetch_adgroup_details(adgroup_id)
+    adgroup = fetch_adgroup_details(advertiser_id, adgroup_id)
     if not adgroup:
         return redirect('dashboard')
 
@@ -471,7 +546,7 @@ def adgroup_update(request, adgroup_id):
 
         # Prepare payload for API (only update budget and end time)
         payload = {
-            "advertiser_id": TIKTOK_ADVERTISER_ID,
+            "advertiser_id": advertiser_id,
             "adgroup_id": adgroup_id,
             "schedule_type": "SCHEDULE_START_END",
             "schedule_end_time": api_end,
@@ -479,12 +554,13 @@ def adgroup_update(request, adgroup_id):
         }
 
         # Normal update
-        response = requests.post(f"{BASE_URL}/adgroup/update/", json=payload, headers=HEADERS)
-        if response.status_code in [200, 204] or (response.status_code == 200 and response.json().get("code") == 0):
+        response = get_client().post("adgroup/update/", payload)
+        error_msg = response_error(response)
+        if error_msg is None:
+            record_write("adgroup", advertiser_id, [adgroup_id], budget=budget, schedule_end_time=api_end)
             # Construct success message
             success_message = f"Ad Group ID {adgroup_id} has been updated: Budget from ${old_budget:.2f} to ${budget:.2f}, Schedule End from {old_end} to {api_end}"
             return redirect(f"/dashboard/?message={quote(success_message)}")
-        error_msg = response.json().get('message', response.text)
         return render(request, 'adgroup_update.html', {
             'adgroup': adgroup, 'current_datetime': now,
             'error': f"Update failed: {error_msg}"
@@ -499,6 +575,7 @@ def adgroup_update(request, adgroup_id):
 def adgroup_bulk_update_schedule(request):
     if not request.user.is_authenticated:
         return redirect('ui_login')
+    advertiser_id = require_advertiser(request)
 
     if request.method == 'POST':
         selected_adgroups = request.POST.getlist('adgroup_ids')
@@ -506,13 +583,10 @@ def adgroup_bulk_update_schedule(request):
 
         # Validate input
         if not new_end:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
+            page_obj = paginate(request, "adgroup")
             return render(request, 'adgroup_bulk_update_schedule.html', {
                 'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
+                'no_adgroups': page_obj.paginator.count == 0,
                 'error': "Please provide an end time."
             })
 
@@ -523,75 +597,208 @@ def adgroup_bulk_update_schedule(request):
             if end_dt <= now:
                 raise ValueError("End time must be in the future.")
         except ValueError as e:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
+            page_obj = paginate(request, "adgroup")
             return render(request, 'adgroup_bulk_update_schedule.html', {
                 'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
+                'no_adgroups': page_obj.paginator.count == 0,
                 'error': str(e)
             })
 
         api_end = end_dt.strftime('%Y-%m-%d %H:%M:00')
 
-        # Process updates
-        update_errors = []
-        updated_adgroups = []
-        for adgroup_id in selected_adgroups:
-            adgroup = fetch_adgroup_details(adgroup_id)
-            if not adgroup:
-                update_errors.append(f"{adgroup_id} (Not found)")
-                continue
-
-            # Ensure end time is after start time if start exists
-            existing_start = adgroup.get('schedule_start_time', 'N/A')
-            if existing_start != 'N/A':
-                try:
-                    start_dt = datetime.strptime(existing_start, '%Y-%m-%d %H:%M:%S')
-                    if end_dt <= start_dt:
-                        update_errors.append(f"{adgroup_id} (End time must be after start time: {existing_start})")
-                        continue
-                except ValueError:
-                    pass
-
-            payload = {
-                "advertiser_id": TIKTOK_ADVERTISER_ID,
-                "adgroup_id": adgroup_id,
-                "schedule_type": "SCHEDULE_START_END",
-                "schedule_end_time": api_end,
-            }
-            try:
-                response = requests.post(f"{BASE_URL}/adgroup/update/", json=payload, headers=HEADERS)
-                if response.status_code in [200, 204] or (response.status_code == 200 and response.json().get("code") == 0):
-                    updated_adgroups.append(adgroup_id)
-                else:
-                    error_detail = response.json().get('message', response.text)
-                    update_errors.append(f"{adgroup_id} ({error_detail})")
-            except requests.exceptions.RequestException as e:
-                update_errors.append(f"{adgroup_id} (Request failed: {str(e)})")
-
-        # Handle results
-        if not update_errors and updated_adgroups:
-            success_message = f"Ad Groups {', '.join(updated_adgroups)} updated with new Schedule End: {api_end}"
-            return redirect(f"/dashboard/?message={quote(success_message)}")
-        elif update_errors:
-            page_number = request.GET.get('page', 1)
-            adgroups = fetch_adgroups(page=page_number, page_size=100)
-            paginator = Paginator(adgroups, 100)
-            page_obj = paginator.get_page(page_number)
-            return render(request, 'adgroup_bulk_update_schedule.html', {
-                'page_obj': page_obj,
-                'no_adgroups': len(adgroups) == 0,
-                'error': f"Failed to update ad groups: {', '.join(update_errors)}"
-            })
+        if selected_adgroups:
+            if request.POST.get('confirm') == "1":
+                job = submit_job("adgroup", BulkJob.SCHEDULE_END, api_end, selected_adgroups,
+                                 advertiser_id, request.user)
+                return redirect('job_detail', job_id=job.pk)
+            from .planner import plan_bulk_change  # pulls in numpy
+            plan = plan_bulk_change("adgroup", BulkJob.SCHEDULE_END, api_end, selected_adgroups, advertiser_id)
+            return render_plan(request, plan, 'adgroup_ids', 'schedule_end', 'adgroup_bulk_update_schedule')
 
     # On GET, render the bulk update page
-    page_number = request.GET.get('page', 1)
-    adgroups = fetch_adgroups(page=page_number, page_size=100)
-    paginator = Paginator(adgroups, 100)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, "adgroup")
     return render(request, 'adgroup_bulk_update_schedule.html', {
         'page_obj': page_obj,
-        'no_adgroups': len(adgroups) == 0
+        'no_adgroups': page_obj.paginator.count == 0
     })
+
+def job_detail(request, job_id):
+    """
+    Shows a bulk job's progress; the page polls job_progress until it finishes.
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+
+    job = get_object_or_404(BulkJob, pk=job_id)
+    if not can_access(request, job.advertiser_id):
+        raise Http404("No such job.")
+    return render(request, 'job_detail.html', {'job': job, 'progress': job_progress(job)})
+
+def job_progress_json(request, job_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    job = get_object_or_404(BulkJob, pk=job_id)
+    if not can_access(request, job.advertiser_id):
+        raise Http404("No such job.")
+    return JsonResponse(job_progress(job))
+
+def report(request):
+    """
+    Spend and performance per ad group or campaign over a date range, with an
+    optional comparison against the previous period of the same length.
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    # numpy is only needed here, so keep it out of every other request's startup.
+    from . import reporting
+
+    today = date.today()
+    context = {
+        'levels': reporting.LEVELS,
+        'sort_keys': reporting.SORT_KEYS,
+        'level': request.GET.get('level') if request.GET.get('level') in reporting.LEVELS else "adgroup",
+        'sort': request.GET.get('sort') if request.GET.get('sort') in reporting.SORT_KEYS else "spend",
+        'compare': request.GET.get('compare') == "1",
+    }
+    try:
+        start = date.fromisoformat(request.GET.get('start') or (today - timedelta(days=6)).isoformat())
+        end = date.fromisoformat(request.GET.get('end') or today.isoformat())
+        if start > end:
+            raise ValueError("Start date must not be after end date.")
+        if (end - start).days >= 366:
+            raise ValueError("Date range must be at most a year.")
+    except ValueError as e:
+        return render(request, 'report.html', {**context, 'error': f"Invalid date range: {e}"})
+    context.update(start=start, end=end)
+
+    first_day = start - (end - start + timedelta(days=1)) if context['compare'] else start
+    try:
+        cube = reporting.get_cube(advertiser_id, first_day, end, refresh=request.GET.get('refresh') == "1")
+    except (requests.exceptions.RequestException, TikTokAPIError) as e:
+        print(f"❌ Error fetching report: {e}")
+        return render(request, 'report.html', {**context, 'error': "Could not load the report from TikTok."})
+
+    rows, totals = reporting.report_table(cube, start, end, context['level'], context['compare'],
+                                          context['sort'], limit=REPORT_ROW_LIMIT)
+    return render(request, 'report.html', {**context, 'rows': rows, 'totals': totals, 'row_limit': REPORT_ROW_LIMIT})
+
+def export(request, kind):
+    """
+    Streams every campaign or ad group as CSV or NDJSON, with the columns
+    picked in `?columns=` (repeated or comma-separated).
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown format. Choose from {', '.join(FORMATS)}.")
+    try:
+        columns = columns_for(kind, request.GET.getlist('columns'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    try:
+        lines = export_lines(kind, advertiser_id, columns, format)
+    except (requests.exceptions.RequestException, TikTokAPIError) as e:
+        print(f"❌ Error exporting {kind}s: {e}")
+        return HttpResponse(f"Could not export {kind}s from TikTok.", status=502, content_type="text/plain")
+
+    response = StreamingHttpResponse(lines, content_type=FORMATS[format])
+    filename = f"{kind}s-{date.today().isoformat()}.{format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def search(request, kind):
+    """
+    Filters and sorts every campaign or ad group of the account by name,
+    status, budget, schedule end and campaign, using the in-memory index.
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+    advertiser_id = current_advertiser(request)
+
+    # numpy is only needed here, so keep it out of every other request's startup.
+    from .search import COLUMNS, SORT_KEYS, STATUSES, get_index
+
+    filters = {
+        'text': request.GET.get('q', '').strip(),
+        'status': request.GET.get('status') if request.GET.get('status') in STATUSES else None,
+        'campaign_id': request.GET.get('campaign_id', '').strip() or None,
+        'sort': request.GET.get('sort') if request.GET.get('sort') in SORT_KEYS else "name",
+        'descending': request.GET.get('order') == "desc",
+    }
+    context = {
+        'kind': kind,
+        'sort_keys': [key for key in SORT_KEYS if key in COLUMNS[kind].values()],
+        'statuses': STATUSES,
+        'query': request.GET,
+    }
+    try:
+        for bound in ('budget_min', 'budget_max'):
+            filters[bound] = float(request.GET[bound]) if request.GET.get(bound) else None
+        if request.GET.get('end_after'):
+            filters['end_after'] = f"{date.fromisoformat(request.GET['end_after'])} 00:00:00"
+        if request.GET.get('end_before'):
+            filters['end_before'] = f"{date.fromisoformat(request.GET['end_before'])} 23:59:59"
+    except ValueError as e:
+        return render(request, 'search.html', {**context, 'error': f"Invalid filter: {e}"})
+
+    try:
+        search_index = get_index(kind, advertiser_id, refresh=request.GET.get('refresh') == "1")
+    except (requests.exceptions.RequestException, TikTokAPIError) as e:
+        print(f"❌ Error loading {kind}s for search: {e}")
+        return render(request, 'search.html', {**context, 'error': f"Could not load {kind}s from TikTok."})
+
+    started = time.perf_counter()
+    results = search_index.search(**filters)
+    took_ms = (time.perf_counter() - started) * 1000
+
+    page_number, page_size = parse_page_args(request)
+    paginator = Paginator(results, page_size)
+    paginator.page_sizes = PAGE_SIZES
+    page_obj = paginator.get_page(page_number)
+    normalize = normalize_campaign if kind == "campaign" else normalize_adgroup
+    page_obj.object_list = [normalize(dict(record)) for record in search_index.records_at(page_obj.object_list)]
+
+    page_query = request.GET.copy()
+    for key in ('page', 'page_size', 'refresh'):
+        page_query.pop(key, None)
+    return render(request, 'search.html', {
+        **context,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode() + "&" if page_query else "",
+        'searched': len(search_index),
+        'took_ms': took_ms,
+    })
+
+def campaign_search(request):
+    return search(request, "campaign")
+
+def adgroup_search(request):
+    return search(request, "adgroup")
+
+def campaign_export(request):
+    return export(request, "campaign")
+
+def adgroup_export(request):
+    return export(request, "adgroup")
+
+def switch_account(request):
+    """
+    Makes another of the user's advertiser accounts the current one.
+    """
+    if not request.user.is_authenticated:
+        return redirect('ui_login')
+    if request.method == 'POST':
+        advertiser_id = request.POST.get('advertiser_id')
+        if can_access(request, advertiser_id):
+            request.session[SESSION_KEY] = advertiser_id
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('dashboard')
+    return redirect(next_url)
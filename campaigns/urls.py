@@ -1,6 +1,21 @@
 from django.urls import path
+from django.utils.module_loading import import_string
 from . import ui_views
-from . import views
+from . import async_views
+
+
+def lazy_view(name, csrf_exempt=False):
+    """
+    Import the view on its first request, so a cold start serving the UI
+    doesn't load DRF for the few API endpoints that use it.
+    """
+    def view(request, *args, **kwargs):
+        return import_string(name)(request, *args, **kwargs)
+    # CsrfViewMiddleware checks this before the real view is imported;
+    # DRF views are exempt and do their own CSRF checks.
+    view.csrf_exempt = csrf_exempt
+    return view
+
 
 urlpatterns = [
     # UI endpoints
@@ -18,8 +33,36 @@ path('adgroups/detail/<str:adgroup_id>/', ui_views.adgroup_detail, name='adgroup
     path('adgroups/', ui_views.adgroup_listing, name='adgroup_listing'),
     path('adgroups/update/<str:adgroup_id>/', ui_views.adgroup_update, name='adgroup_update'),
     path('adgroups/bulk_update/', ui_views.adgroup_bulk_update, name='adgroup_bulk_update'),
+    path('campaigns/bulk_status/', ui_views.campaign_bulk_status, name='campaign_bulk_status'),
+    path('adgroups/bulk_status/', ui_views.adgroup_bulk_status, name='adgroup_bulk_status'),
+    path('reports/', ui_views.report, name='report'),
+    path('campaigns/search/', ui_views.campaign_search, name='campaign_search'),
+    path('adgroups/search/', ui_views.adgroup_search, name='adgroup_search'),
+    path('campaigns/export/', ui_views.campaign_export, name='campaign_export'),
+    path('adgroups/export/', ui_views.adgroup_export, name='adgroup_export'),
+    path('jobs/<int:job_id>/', ui_views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/progress/', ui_views.job_progress_json, name='job_progress'),
+    path('accounts/', async_views.accounts_overview, name='accounts_overview'),
+    path('accounts/switch/', ui_views.switch_account, name='switch_account'),
     # API endpoints
-    path('api/login/', views.login_user, name='login_user_api'),
-    path('api/campaigns/', views.fetch_campaigns, name='fetch_campaigns'),
+    path('api/login/', lazy_view('campaigns.views.login_user', csrf_exempt=True), name='login_user_api'),
+    path('metrics', lazy_view('campaigns.views.prometheus_metrics'), name='metrics'),
+    path('api/campaigns/', lazy_view('campaigns.views.campaign_list', csrf_exempt=True), name='api_campaign_list'),
+    path('api/campaigns/<str:campaign_id>/', lazy_view('campaigns.views.get_campaign_details', csrf_exempt=True),
+         name='api_campaign_detail'),
+    path('api/adgroups/', lazy_view('campaigns.views.adgroup_list', csrf_exempt=True), name='api_adgroup_list'),
+    path('api/adgroups/<str:adgroup_id>/', lazy_view('campaigns.views.adgroup_details', csrf_exempt=True),
+         name='api_adgroup_detail'),
 path('adgroup/bulk-update-schedule/', ui_views.adgroup_bulk_update_schedule, name='adgroup_bulk_update_schedule'),
+    # Async UI endpoints (same pages, non-blocking upstream I/O)
+    path('async/dashboard/', async_views.async_dashboard, name='async_dashboard'),
+    path('async/campaigns/listing/', async_views.async_listing, name='async_listing'),
+    path('async/campaign/detail/<str:campaign_id>/', async_views.async_campaign_detail, name='async_campaign_detail'),
+    path('async/campaign/update/<str:campaign_id>/', async_views.async_campaign_update, name='async_campaign_update'),
+    path('async/campaigns/bulk_update/', async_views.async_bulk_update, name='async_bulk_update'),
+    path('async/adgroups/', async_views.async_adgroup_listing, name='async_adgroup_listing'),
+    path('async/adgroups/detail/<str:adgroup_id>/', async_views.async_adgroup_detail, name='async_adgroup_detail'),
+    path('async/adgroups/update/<str:adgroup_id>/', async_views.async_adgroup_update, name='async_adgroup_update'),
+    path('async/adgroups/bulk_update/', async_views.async_adgroup_bulk_update, name='async_adgroup_bulk_update'),
+    path('async/adgroup/bulk-update-schedule/', async_views.async_adgroup_bulk_update_schedule, name='async_adgroup_bulk_update_schedule'),
 ]
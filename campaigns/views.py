@@ -1,29 +1,40 @@
-import os
+import base64
+import binascii
+
 import requests
+from django.conf import settings
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied, ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth import authenticate, login, logout
 from django.middleware.csrf import get_token
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.gzip import gzip_page
 
-# TikTok API Credentials
-TIKTOK_ACCESS_TOKEN = os.getenv("TIKTOK_ACCESS_TOKEN")
-TIKTOK_ADVERTISER_ID = os.getenv("TIKTOK_ADVERTISER_ID")
-BASE_URL = "https://business-api.tiktok.com/open_api/v1.3"
+from .accounts import can_access, current_advertiser
+from .export import columns_for
+from .metrics import registry
+from .pagination import DEFAULT_PAGE_SIZE, PAGE_SIZES
+from .tiktok_client import get_client
+from .ui_views import fetch_by_ids, fetch_page, normalize_adgroup, normalize_campaign
 
-HEADERS = {
-    "Access-Token": TIKTOK_ACCESS_TOKEN,
-    "Content-Type": "application/json"
-}
+# TikTok API Credentials
+TIKTOK_ACCESS_TOKEN = settings.TIKTOK_ACCESS_TOKEN
+TIKTOK_ADVERTISER_ID = settings.TIKTOK_ADVERTISER_ID
+BASE_URL = settings.TIKTOK_BASE_URL
 
-def fetch_campaigns():
+def fetch_campaigns(advertiser_id):
     """
-    Fetch campaigns from TikTok API.
+    Fetch an advertiser's campaigns from TikTok API; none without an advertiser.
     """
-    url = f"{BASE_URL}/campaign/get/?advertiser_id={TIKTOK_ADVERTISER_ID}"
+    if not advertiser_id:
+        return []
     try:
-        response = requests.get(url, headers=HEADERS)
+        response = get_client().get("campaign/get/", {"advertiser_id": advertiser_id})
         response.raise_for_status()
         data = response.json()
         if data.get("code") == 0:
@@ -34,33 +45,132 @@ def fetch_campaigns():
         print(f"❌ Error fetching campaigns: {e}")
         return []
 
-def fetch_campaign_details(campaign_id):
+class UpstreamUnavailable(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "The TikTok API could not be reached."
+    default_code = "upstream_unavailable"
+
+
+def request_advertiser(request):
     """
-    Fetch detailed information for a specific campaign.
+    Return the advertiser an API request reads: `?advertiser_id=` if the
+    user may access it, otherwise the one their session works on.
+    """
+    advertiser_id = request.query_params.get("advertiser_id")
+    if advertiser_id is None:
+        advertiser_id = current_advertiser(request)
+    elif not can_access(request, advertiser_id):
+        raise PermissionDenied("You don't have access to this advertiser.")
+    if not advertiser_id:
+        raise NotFound("No advertiser account is set up.")
+    return advertiser_id
+
+
+def request_fields(request, kind):
+    """
+    Fields picked with `?fields=a,b`; every mirrored field by default.
     """
-    url = f"{BASE_URL}/campaign/get/?advertiser_id={TIKTOK_ADVERTISER_ID}&campaign_id={campaign_id}"
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("code") == 0:
-            campaigns = data.get("data", {}).get("list", [])
-            return campaigns[0] if campaigns else {}
-        return {}
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching campaign details: {e}")
-        return {}
+        return columns_for(kind, request.query_params.getlist("fields"))
+    except ValueError as e:
+        raise ValidationError({"fields": str(e)})
+
+
+def encode_page_token(page, page_size):
+    return base64.urlsafe_b64encode(f"{page}:{page_size}".encode()).decode()
+
+
+def decode_page_token(page_token):
+    """
+    Return the `(page, page_size)` a page token stands for.
 
+    Tokens are page numbers, like TikTok's own paging, not positions in the
+    listing: objects created or deleted between requests shift later pages.
+    """
+    try:
+        page, page_size = (int(part) for part in base64.urlsafe_b64decode(page_token.encode()).decode().split(":"))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound("Invalid page token.")
+    if page < 1 or page_size not in PAGE_SIZES:
+        raise NotFound("Invalid page token.")
+    return page, page_size
+
+
+def object_list(request, kind):
+    """
+    One page of campaigns or ad groups, from the mirror or the shared cache
+    when they have it, with links to the next and previous pages.
+    """
+    advertiser_id = request_advertiser(request)
+    fields = request_fields(request, kind)
+    page_token = request.query_params.get("page_token")
+    if page_token:
+        page, page_size = decode_page_token(page_token)
+    else:
+        page = 1
+        try:
+            page_size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            page_size = None
+        if page_size not in PAGE_SIZES:
+            raise ValidationError({"page_size": f"Choose from {', '.join(map(str, PAGE_SIZES))}."})
+
+    records, page_info = fetch_page(kind, advertiser_id, page, page_size)
+    if not page_info:
+        raise UpstreamUnavailable()
+    url = request.build_absolute_uri()
+    return Response({
+        "next": (replace_query_param(url, "page_token", encode_page_token(page + 1, page_size))
+                 if page < page_info.get("total_page", 0) else None),
+        "previous": replace_query_param(url, "page_token", encode_page_token(page - 1, page_size)) if page > 1 else None,
+        "results": [{field: record.get(field) for field in fields} for record in records],
+    })
+
+
+def object_detail(request, kind, object_id):
+    advertiser_id = request_advertiser(request)
+    fields = request_fields(request, kind)
+    normalize = normalize_campaign if kind == "campaign" else normalize_adgroup
+    record = fetch_by_ids(kind, advertiser_id, [object_id], normalize).get(str(object_id))
+    if record is None:
+        raise NotFound(f"{'Campaign' if kind == 'campaign' else 'Ad group'} not found.")
+    return Response({field: record.get(field) for field in fields})
+
+
+@gzip_page
+@api_view(['GET'])
+def campaign_list(request):
+    """
+    API endpoint listing campaigns; `?fields=`, `?page_size=`, `?page_token=`.
+    """
+    return object_list(request, "campaign")
+
+
+@gzip_page
 @api_view(['GET'])
-@permission_classes([AllowAny])
 def get_campaign_details(request, campaign_id):
     """
     API endpoint to fetch campaign details.
     """
-    campaign = fetch_campaign_details(campaign_id)
-    if campaign:
-        return Response({"status": "success", "campaign": campaign}, status=status.HTTP_200_OK)
-    return Response({"status": "error", "message": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+    return object_detail(request, "campaign", campaign_id)
+
+
+@gzip_page
+@api_view(['GET'])
+def adgroup_list(request):
+    """
+    API endpoint listing ad groups; `?fields=`, `?page_size=`, `?page_token=`.
+    """
+    return object_list(request, "adgroup")
+
+
+@gzip_page
+@api_view(['GET'])
+def adgroup_details(request, adgroup_id):
+    """
+    API endpoint to fetch ad group details.
+    """
+    return object_detail(request, "adgroup", adgroup_id)
 
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
@@ -70,7 +180,7 @@ def login_user(request):
     """
     if request.method == 'GET':
         if request.user.is_authenticated:
-            campaigns = fetch_campaigns()
+            campaigns = fetch_campaigns(current_advertiser(request))
             return Response({"status": "success", "campaigns": campaigns}, status=status.HTTP_200_OK)
         return Response({"status": "login_required", "csrf_token": get_token(request)}, status=status.HTTP_200_OK)
 
@@ -85,3 +195,19 @@ def login_user(request):
             login(request, user)
             return Response({"status": "success", "message": "Login successful"}, status=status.HTTP_200_OK)
         return Response({"status": "error", "message": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+def prometheus_metrics(request):
+    """
+    Expose upstream call, cache and request metrics in Prometheus text format.
+
+    Staff users can always read them; scrapers must send METRICS_TOKEN as a
+    bearer token. With no token configured the endpoint is hidden from
+    everyone else.
+    """
+    if not request.user.is_staff:
+        token = settings.METRICS_TOKEN
+        if not token:
+            raise Http404()
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
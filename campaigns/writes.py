@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from . import api_cache, mirror
+from .record_index import index
+
+
+def record_write(kind, advertiser_id, item_ids, **values):
+    """
+    Reflect a successful write in the mirror and the read cache, and drop
+    stale indexed copies.
+    """
+    values.setdefault("modify_time", datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+    mirror.patch(kind, advertiser_id, item_ids, **values)
+    api_cache.patch(kind, advertiser_id, item_ids, **values)
+    index.discard(kind, advertiser_id, item_ids)
+    # The search index pulls in numpy; only load it once something is written.
+    from . import search as search_index
+    search_index.patch(kind, advertiser_id, item_ids, **values)
+
+
+def record_delete(kind, advertiser_id, item_ids):
+    """
+    Drop deleted objects from the mirror, the read cache and the indexes.
+    """
+    mirror.remove(kind, advertiser_id, item_ids)
+    api_cache.invalidate(kind, advertiser_id, item_ids)
+    index.discard(kind, advertiser_id, item_ids)
+    from . import search as search_index
+    search_index.discard(kind, advertiser_id, item_ids)
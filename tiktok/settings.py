@@ -12,18 +12,16 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-import dj_database_url
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Load environment variables from the .env file
-load_dotenv(os.path.join(BASE_DIR, '.env'))
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
+# Load environment variables from the .env file. Deployments set them in the
+# environment, so python-dotenv is only imported when there is a file to read.
+if os.path.exists(os.path.join(BASE_DIR, '.env')):
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 
 # Quick-start development settings - unsuitable for production
@@ -37,6 +35,11 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['.vercel.app', '.now.sh', '127.0.0.1']
 
+# Lean startup trims what a cold start loads: DRF's own app (only its
+# browsable API needs it, and its template tags pull in pygments, yaml and
+# markdown when the template engine starts) is left out and the API
+# answers JSON only. On by default on Vercel, which sets VERCEL=1.
+LEAN_STARTUP = os.getenv("LEAN_STARTUP", "true" if os.getenv("VERCEL") else "false").lower() == "true"
 
 
 # Application definition
@@ -55,8 +58,11 @@ INSTALLED_APPS = [
     # Your apps
     'campaigns',
 ]
+if LEAN_STARTUP:
+    INSTALLED_APPS.remove('rest_framework')
 
 MIDDLEWARE = [
+    'campaigns.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,13 +79,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': ['templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template once per process instead of on every render.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'campaigns.accounts.advertiser_accounts',
             ],
         },
     },
@@ -90,9 +103,16 @@ WSGI_APPLICATION = 'tiktok.wsgi.application'
 
 # Database Configuration (Using DATABASE_URL)
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Django only connects on the first query, so requests that never touch the
+# database (static files, the login page) don't pay for a connection.
 if DATABASE_URL:
+    import dj_database_url
+
+    # Check a kept-alive connection before reusing it: a frozen serverless
+    # instance can wake up holding one the server has already closed.
     DATABASES = {
-        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600, ssl_require=True)
+        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600, conn_health_checks=True,
+                                          ssl_require=True)
     }
 else:
     DATABASES = {
@@ -105,6 +125,57 @@ else:
             'PORT': os.getenv("SUPABASE_DB_PORT", "5432"),
         }
     }
+# Cache
+# LocMemCache evicts least-recently-used entries once MAX_ENTRIES is reached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiktok',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", "20000")),
+        },
+    },
+    # Rendered table rows, keyed on id and modify_time. Kept in process
+    # memory: a page reads ~100 of them, which would be ~100 round trips
+    # on a network cache.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "10000")),
+        },
+    },
+}
+# State every worker must agree on (the TikTok rate limit budget) needs a
+# cache they all share; REDIS_URL provides one as 'shared'.
+SHARED_CACHE = None
+if os.getenv("REDIS_URL"):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv("REDIS_URL"),
+    }
+    SHARED_CACHE = 'shared'
+
+# With a shared cache, sessions are read from it and only fall back to the
+# database on a miss; without one they stay in the database, so a logout
+# reaches every worker. Cache-backed sessions refuse to start on a
+# per-process cache.
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if SHARED_CACHE else "django.contrib.sessions.backends.db",
+)
+SESSION_CACHE_ALIAS = os.getenv("SESSION_CACHE_ALIAS", SHARED_CACHE or "default")
+
+# With a shared cache, logged-in users, API tokens and users' advertiser
+# accounts are cached too, and dropped when they change, on logout and when
+# a token is deleted. Without one (AUTH_CACHE_ALIAS unset) every request
+# reads them from the database. Users, password hash included, are only
+# kept for AUTH_USER_CACHE_TTL.
+AUTHENTICATION_BACKENDS = ['campaigns.auth.CachedModelBackend']
+AUTH_CACHE_ALIAS = os.getenv("AUTH_CACHE_ALIAS", SHARED_CACHE) or None
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -139,9 +210,26 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
+# Django 5.1 ignores STATICFILES_STORAGE. STATIC_MANIFEST=true serves
+# WhiteNoise's hashed, compressed files; only set it where the build runs
+# collectstatic, since the manifest storage raises on every {% static %}
+# without the manifest it writes. The Vercel build doesn't, so the plain
+# files are served by default.
+STATIC_MANIFEST = os.getenv("STATIC_MANIFEST", "false").lower() == "true"
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('whitenoise.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+# With the manifest, WhiteNoise stats every file under STATIC_ROOT when it
+# starts; with only the hashed copies kept there are half as many.
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'campaigns/static')
 
@@ -154,9 +242,48 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'campaigns.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson when installed, DRF's JSON encoding otherwise.
+    'DEFAULT_RENDERER_CLASSES': (
+        'campaigns.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
+if LEAN_STARTUP:
+    # The browsable API's templates live in the app left out above.
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('campaigns.renderers.ORJSONRenderer',)
+
+# TikTok Business API
+TIKTOK_ACCESS_TOKEN = os.getenv("TIKTOK_ACCESS_TOKEN")
+TIKTOK_ADVERTISER_ID = os.getenv("TIKTOK_ADVERTISER_ID")
+TIKTOK_BASE_URL = os.getenv("TIKTOK_BASE_URL", "https://business-api.tiktok.com/open_api/v1.3")
+TIKTOK_CONNECT_TIMEOUT = float(os.getenv("TIKTOK_CONNECT_TIMEOUT", "3.05"))
+TIKTOK_READ_TIMEOUT = float(os.getenv("TIKTOK_READ_TIMEOUT", "30"))
+TIKTOK_MAX_RETRIES = int(os.getenv("TIKTOK_MAX_RETRIES", "3"))
+TIKTOK_POOL_MAXSIZE = int(os.getenv("TIKTOK_POOL_MAXSIZE", "20"))
+TIKTOK_BULK_CONCURRENCY = int(os.getenv("TIKTOK_BULK_CONCURRENCY", "10"))
+TIKTOK_RECORD_INDEX_TTL = int(os.getenv("TIKTOK_RECORD_INDEX_TTL", "30"))
+TIKTOK_CACHE_ALIAS = os.getenv("TIKTOK_CACHE_ALIAS", "default")
+TIKTOK_CACHE_TTL = int(os.getenv("TIKTOK_CACHE_TTL", "60"))
+TIKTOK_STREAM_WINDOW = int(os.getenv("TIKTOK_STREAM_WINDOW", "4"))
+TIKTOK_REPORT_DAYS = int(os.getenv("TIKTOK_REPORT_DAYS", "90"))
+TIKTOK_REPORT_TTL = int(os.getenv("TIKTOK_REPORT_TTL", "900"))
+TIKTOK_SEARCH_TTL = int(os.getenv("TIKTOK_SEARCH_TTL", "300"))
+
+# Shared TikTok QPS budget. It needs a cache every worker sees (Redis,
+# Memcached); it is on by default once there is one, and refuses to run on
+# a per-process cache.
+TIKTOK_RATELIMIT_CACHE = os.getenv("TIKTOK_RATELIMIT_CACHE", SHARED_CACHE)
+TIKTOK_RATELIMIT_ENABLED = os.getenv(
+    "TIKTOK_RATELIMIT_ENABLED", "true" if TIKTOK_RATELIMIT_CACHE else "false"
+).lower() == "true"
+TIKTOK_READ_QPS = int(os.getenv("TIKTOK_READ_QPS", "20"))
+TIKTOK_WRITE_QPS = int(os.getenv("TIKTOK_WRITE_QPS", "10"))
+TIKTOK_RATELIMIT_COOLDOWN = int(os.getenv("TIKTOK_RATELIMIT_COOLDOWN", "30"))
+
+# Bearer token scrapers send to read /metrics; when unset only staff users can.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -14,5 +14,6 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tiktok.settings')
 
 application = get_wsgi_application()
-# Add this line to define `app` for Vercel:
-app = get_wsgi_application()
+# Vercel looks for `app`; reuse the handler instead of building (and loading
+# the middleware for) a second one on every cold start.
+app = application